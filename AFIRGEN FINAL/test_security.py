@@ -4,10 +4,15 @@ Security Testing Script for AFIRGen
 Tests various security measures implemented in the system
 """
 
+import io
+import os
 import requests
 import time
 import sys
-from typing import Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
 
 # Configuration
 BASE_URL = "http://localhost:8000"
@@ -19,16 +24,63 @@ COLORS = {
     "RESET": "\033[0m"
 }
 
+# Colored status labels, built once instead of per printed result
+TEST_PASS = f"{COLORS['GREEN']}✓ PASS{COLORS['RESET']}"
+TEST_FAIL = f"{COLORS['RED']}✗ FAIL{COLORS['RESET']}"
+SUMMARY_PASS = f"{COLORS['GREEN']}PASS{COLORS['RESET']}"
+SUMMARY_FAIL = f"{COLORS['RED']}FAIL{COLORS['RESET']}"
+
+# Status codes that count as the server rejecting malicious input
+REJECT_CODES = frozenset({400, 413})
+
+# Length of the server's FIR_AUTH_KEY (secrets.token_urlsafe(32) yields 43 chars)
+AUTH_KEY_LENGTH = int(os.getenv("AUTH_KEY_LENGTH", "43"))
+
+# Maximum allowed timing variance for authentication responses (50ms)
+TIMING_TOLERANCE_NS = 50_000_000
+
+# Upload size limit enforced by the backend is 25MB
+OVERSIZED_UPLOAD_BYTES = 26 * 1024 * 1024
+
+@lru_cache(maxsize=1)
+def _oversized_payload() -> bytes:
+    """Build the over-limit upload body once and reuse it across runs"""
+    return bytes(OVERSIZED_UPLOAD_BYTES)
+
+# Output buffer of the test group running in the current thread; None means print directly
+_output: ContextVar[Optional[io.StringIO]] = ContextVar("_output", default=None)
+
+def emit(line: str):
+    """Print a line, or buffer it when the test group is capturing output"""
+    buf = _output.get()
+    if buf is None:
+        print(line)
+    else:
+        buf.write(line + "\n")
+
+def run_buffered(test: Callable[[], bool]) -> Tuple[bool, str]:
+    """Run a test group with its output captured; returns (passed, output)"""
+    buf = io.StringIO()
+    token = _output.set(buf)
+    try:
+        return test(), buf.getvalue()
+    finally:
+        _output.reset(token)
+
+def print_section(title: str):
+    """Print a test group heading"""
+    emit(f"\n{COLORS['BLUE']}Testing {title}...{COLORS['RESET']}")
+
 def print_test(name: str, passed: bool, message: str = ""):
     """Print test result with color"""
-    status = f"{COLORS['GREEN']}✓ PASS{COLORS['RESET']}" if passed else f"{COLORS['RED']}✗ FAIL{COLORS['RESET']}"
-    print(f"{status} - {name}")
+    status = TEST_PASS if passed else TEST_FAIL
+    emit(f"{status} - {name}")
     if message:
-        print(f"  {message}")
+        emit(f"  {message}")
 
 def test_cors_protection() -> bool:
     """Test CORS configuration"""
-    print(f"\n{COLORS['BLUE']}Testing CORS Protection...{COLORS['RESET']}")
+    print_section("CORS Protection")
     
     # Test with malicious origin
     try:
@@ -52,7 +104,7 @@ def test_cors_protection() -> bool:
 
 def test_rate_limiting() -> bool:
     """Test rate limiting"""
-    print(f"\n{COLORS['BLUE']}Testing Rate Limiting...{COLORS['RESET']}")
+    print_section("Rate Limiting")
     
     try:
         # Make requests until rate limit is hit
@@ -75,7 +127,7 @@ def test_rate_limiting() -> bool:
 
 def test_input_validation() -> bool:
     """Test input validation and sanitization"""
-    print(f"\n{COLORS['BLUE']}Testing Input Validation...{COLORS['RESET']}")
+    print_section("Input Validation")
     
     all_passed = True
     
@@ -86,7 +138,7 @@ def test_input_validation() -> bool:
             data={"text": "<script>alert('xss')</script>"}
         )
         # Should either reject or sanitize
-        passed = response.status_code in [400, 413] or "<script>" not in response.text
+        passed = response.status_code in REJECT_CODES or b"<script>" not in response.content
         print_test("XSS prevention in text input", passed)
         all_passed = all_passed and passed
     except Exception as e:
@@ -115,9 +167,21 @@ def test_input_validation() -> bool:
     
     return all_passed
 
+def _time_auth_attempt(auth_key: str) -> int:
+    """Time a single rejected /authenticate call in nanoseconds"""
+    start = time.perf_counter_ns()
+    requests.post(
+        f"{BASE_URL}/authenticate",
+        json={
+            "fir_number": "FIR-12345678-20250101000000",
+            "auth_key": auth_key
+        }
+    )
+    return time.perf_counter_ns() - start
+
 def test_authentication() -> bool:
     """Test authentication security"""
-    print(f"\n{COLORS['BLUE']}Testing Authentication...{COLORS['RESET']}")
+    print_section("Authentication")
     
     all_passed = True
     
@@ -138,25 +202,34 @@ def test_authentication() -> bool:
         all_passed = False
     
     # Test timing attack resistance (basic check)
+    # The backend compares keys with hmac.compare_digest(), so rejection time
+    # must not depend on how much of the key matches or on its length.
     try:
-        times = []
-        for _ in range(5):
-            start = time.time()
-            requests.post(
-                f"{BASE_URL}/authenticate",
-                json={
-                    "fir_number": "FIR-12345678-20250101000000",
-                    "auth_key": "wrong-key-" + "x" * 50
-                }
-            )
-            times.append(time.time() - start)
-        
-        # Check if times are relatively consistent (within 50ms variance)
-        avg_time = sum(times) / len(times)
-        variance = max(abs(t - avg_time) for t in times)
-        passed = variance < 0.05  # 50ms
-        
-        print_test("Timing attack resistance", passed, f"Variance: {variance*1000:.2f}ms")
+        wrong_keys = {
+            "short": "wrong-key",
+            "matched length": "wrong-key-".ljust(AUTH_KEY_LENGTH, "x"),
+            "long": "wrong-key-".ljust(AUTH_KEY_LENGTH * 2, "x"),
+        }
+        # Warm-up request so connection setup is not counted in the first sample
+        _time_auth_attempt(wrong_keys["matched length"])
+
+        means = []
+        for label, auth_key in wrong_keys.items():
+            times = [_time_auth_attempt(auth_key) for _ in range(5)]
+
+            # Check if times are relatively consistent (within 50ms variance)
+            avg_ns = sum(times) // len(times)
+            variance_ns = max(abs(t - avg_ns) for t in times)
+            means.append(avg_ns)
+            passed = variance_ns < TIMING_TOLERANCE_NS
+
+            print_test(f"Timing attack resistance ({label} key)", passed, f"Variance: {variance_ns / 1_000_000:.2f}ms")
+            all_passed = all_passed and passed
+
+        # Short and long keys must not be rejected measurably faster or slower
+        spread_ns = max(means) - min(means)
+        passed = spread_ns < TIMING_TOLERANCE_NS
+        print_test("Timing independent of key length", passed, f"Spread: {spread_ns / 1_000_000:.2f}ms")
         all_passed = all_passed and passed
     except Exception as e:
         print_test("Timing attack resistance", False, f"Error: {e}")
@@ -166,11 +239,12 @@ def test_authentication() -> bool:
 
 def test_security_headers() -> bool:
     """Test security headers"""
-    print(f"\n{COLORS['BLUE']}Testing Security Headers...{COLORS['RESET']}")
+    print_section("Security Headers")
     
     try:
         response = requests.get(f"{BASE_URL}/health")
-        headers = response.headers
+        # Snapshot headers into a plain dict keyed by lowercase name
+        headers = {name.lower(): value for name, value in response.headers.items()}
         
         required_headers = {
             "X-Content-Type-Options": "nosniff",
@@ -182,13 +256,14 @@ def test_security_headers() -> bool:
         
         all_passed = True
         for header, expected_value in required_headers.items():
-            has_header = header in headers
+            value = headers.get(header.lower())
+            has_header = value is not None
             if expected_value:
-                passed = has_header and headers.get(header) == expected_value
+                passed = value == expected_value
             else:
                 passed = has_header
             
-            print_test(f"Header: {header}", passed, f"Value: {headers.get(header, 'MISSING')}")
+            print_test(f"Header: {header}", passed, f"Value: {value if has_header else 'MISSING'}")
             all_passed = all_passed and passed
         
         return all_passed
@@ -198,16 +273,15 @@ def test_security_headers() -> bool:
 
 def test_file_upload_validation() -> bool:
     """Test file upload validation"""
-    print(f"\n{COLORS['BLUE']}Testing File Upload Validation...{COLORS['RESET']}")
+    print_section("File Upload Validation")
     
     all_passed = True
     
     # Test oversized file
     try:
-        large_content = b"x" * (26 * 1024 * 1024)  # 26MB (over limit)
         response = requests.post(
             f"{BASE_URL}/process",
-            files={"audio": ("test.wav", large_content, "audio/wav")}
+            files={"audio": ("test.wav", io.BytesIO(_oversized_payload()), "audio/wav")}
         )
         passed = response.status_code == 413
         print_test("Rejects oversized files", passed)
@@ -233,7 +307,7 @@ def test_file_upload_validation() -> bool:
 
 def test_session_validation() -> bool:
     """Test session validation"""
-    print(f"\n{COLORS['BLUE']}Testing Session Validation...{COLORS['RESET']}")
+    print_section("Session Validation")
     
     all_passed = True
     
@@ -268,7 +342,12 @@ def main():
     
     # Check if server is running
     try:
-        response = requests.get(f"{BASE_URL}/health", timeout=5)
+        # HEAD avoids transferring the health payload; fall back to a
+        # streamed GET (body never read) if the route does not allow HEAD
+        response = requests.head(f"{BASE_URL}/health", timeout=5)
+        if response.status_code == 405:
+            response = requests.get(f"{BASE_URL}/health", timeout=5, stream=True)
+            response.close()
         if response.status_code != 200:
             print(f"\n{COLORS['RED']}Error: Server is not healthy{COLORS['RESET']}")
             sys.exit(1)
@@ -277,16 +356,29 @@ def main():
         print("Make sure the server is running: docker-compose up")
         sys.exit(1)
     
-    # Run all tests
-    results = {
-        "CORS Protection": test_cors_protection(),
-        "Rate Limiting": test_rate_limiting(),
-        "Input Validation": test_input_validation(),
-        "Authentication": test_authentication(),
-        "Security Headers": test_security_headers(),
-        "File Upload Validation": test_file_upload_validation(),
-        "Session Validation": test_session_validation(),
+    # Independent, I/O-bound test groups run concurrently. Each group's output is
+    # buffered and printed in list order once all have finished, so lines stay under
+    # their own heading
+    independent = {
+        "CORS Protection": test_cors_protection,
+        "Input Validation": test_input_validation,
+        "Security Headers": test_security_headers,
+        "File Upload Validation": test_file_upload_validation,
+        "Session Validation": test_session_validation,
     }
+    with ThreadPoolExecutor(max_workers=len(independent)) as executor:
+        outcomes = list(executor.map(run_buffered, independent.values()))
+    
+    results = {}
+    for name, (passed, output) in zip(independent, outcomes):
+        sys.stdout.write(output)
+        results[name] = passed
+    
+    # Authentication measures response-time variance, so it runs serially where other
+    # groups' load cannot skew the timings; rate limiting runs last on its own so it
+    # does not exhaust other tests' quota
+    results["Authentication"] = test_authentication()
+    results["Rate Limiting"] = test_rate_limiting()
     
     # Summary
     print(f"\n{COLORS['YELLOW']}{'='*60}{COLORS['RESET']}")
@@ -297,7 +389,7 @@ def main():
     total_count = len(results)
     
     for test_name, passed in results.items():
-        status = f"{COLORS['GREEN']}PASS{COLORS['RESET']}" if passed else f"{COLORS['RED']}FAIL{COLORS['RESET']}"
+        status = SUMMARY_PASS if passed else SUMMARY_FAIL
         print(f"{test_name:30s}: {status}")
     
     print(f"\n{COLORS['YELLOW']}Total: {passed_count}/{total_count} tests passed{COLORS['RESET']}")
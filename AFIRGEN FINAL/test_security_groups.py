@@ -14,7 +14,9 @@ Requirements:
 
 import argparse
 import sys
-from typing import List, Dict, Tuple
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, NamedTuple, Optional, Set, Tuple
 from dataclasses import dataclass
 
 try:
@@ -29,6 +31,33 @@ except ImportError as e:
 # Initialize colorama
 init(autoreset=True)
 
+# Page size for paginated EC2 describe calls
+PAGE_SIZE = 100
+
+# EC2 accepts at most 200 values per describe filter
+FILTER_VALUES_LIMIT = 200
+
+# Worker threads for per-security-group checks
+MAX_WORKERS = 8
+
+# Ports the ALB may expose to the internet
+ALB_PUBLIC_PORTS = frozenset({80, 443})
+
+# Ports whose internet exposure is always critical
+CRITICAL_PORTS = frozenset({22, 3389, 3306})
+
+# MySQL, PostgreSQL, MSSQL, MongoDB, Redis
+DATABASE_PORTS = frozenset({3306, 5432, 1433, 27017, 6379})
+
+# Remote administration ports
+ADMIN_PORTS = {22: 'SSH', 3389: 'RDP'}
+
+# Private (RFC 1918) CIDR prefixes used by internal services
+RFC1918_PREFIXES = ('10.', '172.', '192.168.')
+
+# Name fragments of services that need internet egress for AWS APIs
+INTERNET_SERVICES = ('backend', 'gguf', 'asr', 'backup')
+
 @dataclass
 class SecurityIssue:
     """Represents a security issue found in security groups"""
@@ -38,6 +67,52 @@ class SecurityIssue:
     issue: str
     recommendation: str
 
+class IngressRule(NamedTuple):
+    """One ingress rule/CIDR pair from a security group's IpPermissions"""
+    from_port: Optional[int]
+    to_port: Optional[int]
+    protocol: Optional[str]
+    cidr: str
+    has_sg_ref: bool
+
+@dataclass(frozen=True)
+class SGMeta:
+    """Security group fields and name-based classification, computed once per group"""
+    id: str
+    name: str
+    name_lower: str
+    is_alb: bool
+    needs_internet: bool
+    ingress: List[IngressRule]
+    egress: List[Dict]
+    
+    @classmethod
+    def from_dict(cls, sg: Dict) -> 'SGMeta':
+        """Build from a describe_security_groups entry"""
+        name_lower = sg['GroupName'].lower()
+        return cls(
+            id=sg['GroupId'],
+            name=sg['GroupName'],
+            name_lower=name_lower,
+            # ALB is allowed to accept traffic from the internet
+            is_alb='alb' in name_lower,
+            # Services that need internet access for AWS services
+            needs_internet=any(x in name_lower for x in INTERNET_SERVICES),
+            # Flatten nested rule -> IpRanges once for all ingress checks
+            ingress=[
+                IngressRule(
+                    from_port=rule.get('FromPort'),
+                    to_port=rule.get('ToPort'),
+                    protocol=rule.get('IpProtocol'),
+                    cidr=ip_range.get('CidrIp'),
+                    has_sg_ref=bool(rule.get('UserIdGroupPairs')),
+                )
+                for rule in sg.get('IpPermissions', [])
+                for ip_range in rule.get('IpRanges', [])
+            ],
+            egress=sg.get('IpPermissionsEgress', []),
+        )
+
 class SecurityGroupValidator:
     """Validates AWS security groups for least privilege compliance"""
     
@@ -62,160 +137,194 @@ class SecurityGroupValidator:
     def get_security_groups(self, project_name: str = 'afirgen') -> List[Dict]:
         """Fetch all security groups for the project"""
         try:
-            response = self.ec2.describe_security_groups(
+            paginator = self.ec2.get_paginator('describe_security_groups')
+            pages = paginator.paginate(
                 Filters=[
                     {'Name': 'tag:Project', 'Values': [project_name]},
-                ]
+                ],
+                PaginationConfig={'PageSize': PAGE_SIZE}
             )
-            return response['SecurityGroups']
+            return [sg for page in pages for sg in page['SecurityGroups']]
         except ClientError as e:
             print(f"{Fore.YELLOW}Warning: Could not fetch security groups: {e}")
             return []
     
-    def check_unrestricted_ingress(self, sg: Dict) -> None:
+    def get_attached_group_ids(self, group_ids: List[str]) -> Optional[Set[str]]:
+        """Fetch the IDs of security groups attached to any network interface"""
+        try:
+            paginator = self.ec2.get_paginator('describe_network_interfaces')
+            attached: Set[str] = set()
+            # One filtered query per chunk of IDs, since EC2 caps the values per filter
+            for start in range(0, len(group_ids), FILTER_VALUES_LIMIT):
+                pages = paginator.paginate(
+                    Filters=[{'Name': 'group-id', 'Values': group_ids[start:start + FILTER_VALUES_LIMIT]}],
+                    PaginationConfig={'PageSize': PAGE_SIZE}
+                )
+                attached.update(
+                    group['GroupId']
+                    for page in pages
+                    for ni in page['NetworkInterfaces']
+                    for group in ni.get('Groups', [])
+                )
+            return attached
+        except ClientError as e:
+            print(f"{Fore.YELLOW}Warning: Could not fetch network interfaces, skipping unused group check: {e}")
+            return None
+    
+    def check_unrestricted_ingress(self, sg: SGMeta) -> List[SecurityIssue]:
         """Check for unrestricted ingress rules (0.0.0.0/0)"""
-        group_id = sg['GroupId']
-        group_name = sg['GroupName']
+        issues: List[SecurityIssue] = []
+        group_id = sg.id
+        group_name = sg.name
         
-        # ALB is allowed to have 0.0.0.0/0 on ports 80 and 443
-        is_alb = 'alb' in group_name.lower()
+        for rule in sg.ingress:
+            if rule.cidr == '0.0.0.0/0':
+                from_port = 'all' if rule.from_port is None else rule.from_port
+                to_port = 'all' if rule.to_port is None else rule.to_port
+                protocol = rule.protocol or 'all'
+                
+                # Allow ALB to have 80 and 443 open
+                if sg.is_alb and from_port in ALB_PUBLIC_PORTS:
+                    continue
+                
+                severity = 'CRITICAL' if from_port in CRITICAL_PORTS else 'HIGH'
+                issues.append(SecurityIssue(
+                    severity=severity,
+                    group_id=group_id,
+                    group_name=group_name,
+                    issue=f"Unrestricted ingress on port {from_port}-{to_port} ({protocol}) from 0.0.0.0/0",
+                    recommendation="Restrict to specific security groups or IP ranges"
+                ))
         
-        for rule in sg.get('IpPermissions', []):
-            for ip_range in rule.get('IpRanges', []):
-                if ip_range.get('CidrIp') == '0.0.0.0/0':
-                    from_port = rule.get('FromPort', 'all')
-                    to_port = rule.get('ToPort', 'all')
-                    protocol = rule.get('IpProtocol', 'all')
-                    
-                    # Allow ALB to have 80 and 443 open
-                    if is_alb and from_port in [80, 443]:
-                        continue
-                    
-                    severity = 'CRITICAL' if from_port in [22, 3389, 3306] else 'HIGH'
-                    self.issues.append(SecurityIssue(
-                        severity=severity,
-                        group_id=group_id,
-                        group_name=group_name,
-                        issue=f"Unrestricted ingress on port {from_port}-{to_port} ({protocol}) from 0.0.0.0/0",
-                        recommendation="Restrict to specific security groups or IP ranges"
-                    ))
+        return issues
     
-    def check_unrestricted_egress(self, sg: Dict) -> None:
+    def check_unrestricted_egress(self, sg: SGMeta) -> List[SecurityIssue]:
         """Check for unrestricted egress rules"""
-        group_id = sg['GroupId']
-        group_name = sg['GroupName']
+        issues: List[SecurityIssue] = []
+        group_id = sg.id
+        group_name = sg.name
         
-        # Services that need internet access for AWS services
-        needs_internet = any(x in group_name.lower() for x in ['backend', 'gguf', 'asr', 'backup'])
-        
-        for rule in sg.get('IpPermissionsEgress', []):
+        for rule in sg.egress:
             # Check for allow all egress (0.0.0.0/0 on all ports)
             if rule.get('IpProtocol') == '-1':
                 for ip_range in rule.get('IpRanges', []):
                     if ip_range.get('CidrIp') == '0.0.0.0/0':
-                        if not needs_internet:
-                            self.issues.append(SecurityIssue(
+                        if not sg.needs_internet:
+                            issues.append(SecurityIssue(
                                 severity='MEDIUM',
                                 group_id=group_id,
                                 group_name=group_name,
                                 issue="Unrestricted egress to 0.0.0.0/0 on all ports",
                                 recommendation="Restrict egress to specific security groups or use VPC endpoints"
                             ))
+        
+        return issues
     
-    def check_database_exposure(self, sg: Dict) -> None:
+    def check_database_exposure(self, sg: SGMeta) -> List[SecurityIssue]:
         """Check if database ports are exposed to internet"""
-        group_id = sg['GroupId']
-        group_name = sg['GroupName']
+        issues: List[SecurityIssue] = []
+        group_id = sg.id
+        group_name = sg.name
         
-        database_ports = [3306, 5432, 1433, 27017, 6379]  # MySQL, PostgreSQL, MSSQL, MongoDB, Redis
+        for rule in sg.ingress:
+            if rule.from_port in DATABASE_PORTS and rule.cidr == '0.0.0.0/0':
+                issues.append(SecurityIssue(
+                    severity='CRITICAL',
+                    group_id=group_id,
+                    group_name=group_name,
+                    issue=f"Database port {rule.from_port} exposed to internet",
+                    recommendation="Restrict database access to application security groups only"
+                ))
         
-        for rule in sg.get('IpPermissions', []):
-            from_port = rule.get('FromPort')
-            if from_port in database_ports:
-                for ip_range in rule.get('IpRanges', []):
-                    if ip_range.get('CidrIp') == '0.0.0.0/0':
-                        self.issues.append(SecurityIssue(
-                            severity='CRITICAL',
-                            group_id=group_id,
-                            group_name=group_name,
-                            issue=f"Database port {from_port} exposed to internet",
-                            recommendation="Restrict database access to application security groups only"
-                        ))
+        return issues
     
-    def check_ssh_rdp_exposure(self, sg: Dict) -> None:
+    def check_ssh_rdp_exposure(self, sg: SGMeta) -> List[SecurityIssue]:
         """Check if SSH or RDP ports are exposed"""
-        group_id = sg['GroupId']
-        group_name = sg['GroupName']
+        issues: List[SecurityIssue] = []
+        group_id = sg.id
+        group_name = sg.name
         
-        admin_ports = {22: 'SSH', 3389: 'RDP'}
+        for rule in sg.ingress:
+            from_port = rule.from_port
+            if from_port in ADMIN_PORTS:
+                cidr = rule.cidr
+                if cidr == '0.0.0.0/0':
+                    issues.append(SecurityIssue(
+                        severity='CRITICAL',
+                        group_id=group_id,
+                        group_name=group_name,
+                        issue=f"{ADMIN_PORTS[from_port]} port {from_port} exposed to internet",
+                        recommendation="Use AWS Systems Manager Session Manager or restrict to VPN/bastion IP"
+                    ))
+                elif not cidr.endswith('/32'):
+                    issues.append(SecurityIssue(
+                        severity='HIGH',
+                        group_id=group_id,
+                        group_name=group_name,
+                        issue=f"{ADMIN_PORTS[from_port]} port {from_port} exposed to {cidr}",
+                        recommendation="Restrict to specific IP addresses (/32)"
+                    ))
         
-        for rule in sg.get('IpPermissions', []):
-            from_port = rule.get('FromPort')
-            if from_port in admin_ports:
-                for ip_range in rule.get('IpRanges', []):
-                    cidr = ip_range.get('CidrIp')
-                    if cidr == '0.0.0.0/0':
-                        self.issues.append(SecurityIssue(
-                            severity='CRITICAL',
-                            group_id=group_id,
-                            group_name=group_name,
-                            issue=f"{admin_ports[from_port]} port {from_port} exposed to internet",
-                            recommendation="Use AWS Systems Manager Session Manager or restrict to VPN/bastion IP"
-                        ))
-                    elif not cidr.endswith('/32'):
-                        self.issues.append(SecurityIssue(
-                            severity='HIGH',
-                            group_id=group_id,
-                            group_name=group_name,
-                            issue=f"{admin_ports[from_port]} port {from_port} exposed to {cidr}",
-                            recommendation="Restrict to specific IP addresses (/32)"
-                        ))
+        return issues
     
-    def check_unused_security_groups(self, sg: Dict) -> None:
+    def check_unused_security_groups(self, sg: SGMeta, attached: Optional[Set[str]]) -> List[SecurityIssue]:
         """Check for security groups with no attached resources"""
-        group_id = sg['GroupId']
-        group_name = sg['GroupName']
+        issues: List[SecurityIssue] = []
+        if attached is None:
+            return issues  # Skip if we can't check
+        
+        group_id = sg.id
+        group_name = sg.name
         
         # Check if security group is attached to any network interfaces
-        try:
-            response = self.ec2.describe_network_interfaces(
-                Filters=[{'Name': 'group-id', 'Values': [group_id]}]
-            )
-            if not response['NetworkInterfaces']:
-                self.issues.append(SecurityIssue(
-                    severity='LOW',
-                    group_id=group_id,
-                    group_name=group_name,
-                    issue="Security group not attached to any resources",
-                    recommendation="Remove unused security groups to reduce attack surface"
-                ))
-        except ClientError:
-            pass  # Skip if we can't check
+        if group_id not in attached:
+            issues.append(SecurityIssue(
+                severity='LOW',
+                group_id=group_id,
+                group_name=group_name,
+                issue="Security group not attached to any resources",
+                recommendation="Remove unused security groups to reduce attack surface"
+            ))
+        
+        return issues
     
-    def check_security_group_references(self, sg: Dict) -> None:
+    def check_security_group_references(self, sg: SGMeta) -> List[SecurityIssue]:
         """Check if rules use security group references instead of CIDR blocks"""
-        group_id = sg['GroupId']
-        group_name = sg['GroupName']
+        issues: List[SecurityIssue] = []
+        group_id = sg.id
+        group_name = sg.name
         
         # Skip ALB as it needs to accept from internet
-        if 'alb' in group_name.lower():
-            return
+        if sg.is_alb:
+            return issues
         
-        for rule in sg.get('IpPermissions', []):
+        for rule in sg.ingress:
             # Check if rule uses CIDR blocks instead of security group references
-            if rule.get('IpRanges') and not rule.get('UserIdGroupPairs'):
-                from_port = rule.get('FromPort', 'all')
-                for ip_range in rule.get('IpRanges', []):
-                    cidr = ip_range.get('CidrIp')
-                    # Internal services should use security group references
-                    if cidr.startswith('10.') or cidr.startswith('172.') or cidr.startswith('192.168.'):
-                        self.issues.append(SecurityIssue(
-                            severity='LOW',
-                            group_id=group_id,
-                            group_name=group_name,
-                            issue=f"Rule uses CIDR block {cidr} instead of security group reference",
-                            recommendation="Use security group references for better maintainability"
-                        ))
+            if not rule.has_sg_ref:
+                cidr = rule.cidr
+                # Internal services should use security group references
+                if cidr.startswith(RFC1918_PREFIXES):
+                    issues.append(SecurityIssue(
+                        severity='LOW',
+                        group_id=group_id,
+                        group_name=group_name,
+                        issue=f"Rule uses CIDR block {cidr} instead of security group reference",
+                        recommendation="Use security group references for better maintainability"
+                    ))
+        
+        return issues
+    
+    def _check_one_sg(self, sg: Dict, attached: Optional[Set[str]]) -> List[SecurityIssue]:
+        """Run all per-security-group checks and collect their issues"""
+        meta = SGMeta.from_dict(sg)
+        return [
+            *self.check_unrestricted_ingress(meta),
+            *self.check_unrestricted_egress(meta),
+            *self.check_database_exposure(meta),
+            *self.check_ssh_rdp_exposure(meta),
+            *self.check_unused_security_groups(meta, attached),
+            *self.check_security_group_references(meta),
+        ]
     
     def check_vpc_flow_logs(self) -> None:
         """Check if VPC Flow Logs are enabled"""
@@ -225,15 +334,20 @@ class SecurityGroupValidator:
                 Filters=[{'Name': 'tag:Project', 'Values': ['afirgen']}]
             )
             
-            for vpc in vpcs['Vpcs']:
-                vpc_id = vpc['VpcId']
-                
+            vpc_ids = [vpc['VpcId'] for vpc in vpcs['Vpcs']]
+            if not vpc_ids:
+                return
+            
+            # Fetch flow logs for all VPCs at once
+            pages = self.ec2.get_paginator('describe_flow_logs').paginate(
+                Filters=[{'Name': 'resource-id', 'Values': vpc_ids}],
+                PaginationConfig={'PageSize': PAGE_SIZE}
+            )
+            with_flow_logs = {fl['ResourceId'] for page in pages for fl in page['FlowLogs']}
+            
+            for vpc_id in vpc_ids:
                 # Check if flow logs are enabled
-                flow_logs = self.ec2.describe_flow_logs(
-                    Filters=[{'Name': 'resource-id', 'Values': [vpc_id]}]
-                )
-                
-                if not flow_logs['FlowLogs']:
+                if vpc_id not in with_flow_logs:
                     self.issues.append(SecurityIssue(
                         severity='MEDIUM',
                         group_id=vpc_id,
@@ -257,24 +371,21 @@ class SecurityGroupValidator:
         print(f"{Fore.GREEN}Found {len(security_groups)} security groups")
         print(f"{Fore.CYAN}Running validation checks...\n")
         
-        for sg in security_groups:
-            self.check_unrestricted_ingress(sg)
-            self.check_unrestricted_egress(sg)
-            self.check_database_exposure(sg)
-            self.check_ssh_rdp_exposure(sg)
-            self.check_unused_security_groups(sg)
-            self.check_security_group_references(sg)
+        # One network interface lookup covers every security group
+        attached = self.get_attached_group_ids([sg['GroupId'] for sg in security_groups])
+        
+        # Per-group checks are independent; results are merged in input order
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            for sg_issues in executor.map(lambda sg: self._check_one_sg(sg, attached), security_groups):
+                self.issues.extend(sg_issues)
         
         # Check VPC-level settings
         self.check_vpc_flow_logs()
         
         # Count issues by severity
-        critical = sum(1 for i in self.issues if i.severity == 'CRITICAL')
-        high = sum(1 for i in self.issues if i.severity == 'HIGH')
-        medium = sum(1 for i in self.issues if i.severity == 'MEDIUM')
-        low = sum(1 for i in self.issues if i.severity == 'LOW')
+        counts = Counter(i.severity for i in self.issues)
         
-        return critical, high, medium, low
+        return counts['CRITICAL'], counts['HIGH'], counts['MEDIUM'], counts['LOW']
     
     def print_results(self) -> None:
         """Print validation results"""
@@ -284,10 +395,13 @@ class SecurityGroupValidator:
             return
         
         # Group issues by severity
-        critical_issues = [i for i in self.issues if i.severity == 'CRITICAL']
-        high_issues = [i for i in self.issues if i.severity == 'HIGH']
-        medium_issues = [i for i in self.issues if i.severity == 'MEDIUM']
-        low_issues = [i for i in self.issues if i.severity == 'LOW']
+        by_severity: Dict[str, List[SecurityIssue]] = defaultdict(list)
+        for issue in self.issues:
+            by_severity[issue.severity].append(issue)
+        critical_issues = by_severity['CRITICAL']
+        high_issues = by_severity['HIGH']
+        medium_issues = by_severity['MEDIUM']
+        low_issues = by_severity['LOW']
         
         # Print critical issues
         if critical_issues:
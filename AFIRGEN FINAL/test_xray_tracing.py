@@ -3,12 +3,18 @@
 Test script for AWS X-Ray distributed tracing integration
 """
 
+import argparse
+import functools
+import io
 import os
 import sys
 import time
 import asyncio
 import httpx
+import orjson
+from contextvars import ContextVar
 from datetime import datetime
+from typing import Optional
 
 # Test configuration
 BASE_URL = os.getenv("BASE_URL", "http://localhost:8000")
@@ -16,6 +22,24 @@ API_KEY = os.getenv("API_KEY", "test-api-key")
 MODEL_SERVER_URL = os.getenv("MODEL_SERVER_URL", "http://localhost:8001")
 ASR_OCR_SERVER_URL = os.getenv("ASR_OCR_SERVER_URL", "http://localhost:8002")
 
+# Sampling rate used when XRAY_SAMPLING_RATE is unset; the environment variable is the
+# same one the servers read, so the traced subset matches production
+DEFAULT_SAMPLING_RATE = 0.1
+
+# Trace header overrides honoured by the X-Ray middleware's sampling decision
+UNSAMPLED_HEADERS = {"X-Amzn-Trace-Id": "Sampled=0"}
+SAMPLED_HEADERS = {"X-Amzn-Trace-Id": "Sampled=1"}
+
+# Default number of simultaneous requests in the concurrent tracing test
+DEFAULT_CONCURRENCY = 5
+
+# Upper bound on requests in flight at once during the concurrent test
+MAX_IN_FLIGHT = 100
+
+# Request timeouts, built once and shared by every call; HEALTH_TIMEOUT is also the client default
+HEALTH_TIMEOUT = httpx.Timeout(10.0, connect=2.0)
+PROCESS_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+
 # Colors for output
 GREEN = "\033[92m"
 RED = "\033[91m"
@@ -24,39 +48,65 @@ BLUE = "\033[94m"
 RESET = "\033[0m"
 
 
+# Per-test output buffer; None means write straight to stdout
+_output: ContextVar[Optional[io.StringIO]] = ContextVar("_output", default=None)
+
+
+def emit(text: str):
+    """Write text to the current test's buffer, or stdout outside a test"""
+    buf = _output.get()
+    if buf is None:
+        sys.stdout.write(text)
+    else:
+        buf.write(text)
+
+
+def buffered_output(test):
+    """Collect a test's output and write it to stdout in one call when it finishes"""
+    @functools.wraps(test)
+    async def wrapper(*args, **kwargs):
+        buf = io.StringIO()
+        token = _output.set(buf)
+        try:
+            return await test(*args, **kwargs)
+        finally:
+            _output.reset(token)
+            sys.stdout.write(buf.getvalue())
+            sys.stdout.flush()
+    return wrapper
+
+
 def print_test(name: str):
     """Print test name"""
-    print(f"\n{BLUE}{'='*60}{RESET}")
-    print(f"{BLUE}Test: {name}{RESET}")
-    print(f"{BLUE}{'='*60}{RESET}")
+    emit(f"\n{BLUE}{'='*60}{RESET}\n{BLUE}Test: {name}{RESET}\n{BLUE}{'='*60}{RESET}\n")
 
 
 def print_success(message: str):
     """Print success message"""
-    print(f"{GREEN}✓ {message}{RESET}")
+    emit(f"{GREEN}✓ {message}{RESET}\n")
 
 
 def print_error(message: str):
     """Print error message"""
-    print(f"{RED}✗ {message}{RESET}")
+    emit(f"{RED}✗ {message}{RESET}\n")
 
 
 def print_info(message: str):
     """Print info message"""
-    print(f"{YELLOW}ℹ {message}{RESET}")
+    emit(f"{YELLOW}ℹ {message}{RESET}\n")
 
 
-async def test_xray_configuration():
+@buffered_output
+async def test_xray_configuration(sampling_rate: float = DEFAULT_SAMPLING_RATE):
     """Test 1: Verify X-Ray configuration"""
     print_test("X-Ray Configuration")
     
     # Check environment variables
     xray_enabled = os.getenv("XRAY_ENABLED", "true")
-    xray_sampling = os.getenv("XRAY_SAMPLING_RATE", "0.1")
     xray_daemon = os.getenv("XRAY_DAEMON_ADDRESS", "127.0.0.1:2000")
     
     print_info(f"XRAY_ENABLED: {xray_enabled}")
-    print_info(f"XRAY_SAMPLING_RATE: {xray_sampling}")
+    print_info(f"XRAY_SAMPLING_RATE: {sampling_rate}")
     print_info(f"XRAY_DAEMON_ADDRESS: {xray_daemon}")
     
     if xray_enabled.lower() == "true":
@@ -65,214 +115,238 @@ async def test_xray_configuration():
         print_error("X-Ray is disabled")
         return False
     
+    if not 0.0 <= sampling_rate <= 1.0:
+        print_error(f"XRAY_SAMPLING_RATE must be between 0.0 and 1.0, got {sampling_rate}")
+        return False
+    
     return True
 
 
-async def test_main_backend_health():
+@buffered_output
+async def test_main_backend_health(client: httpx.AsyncClient):
     """Test 2: Main backend health check with X-Ray"""
     print_test("Main Backend Health Check")
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{BASE_URL}/health", timeout=10.0)
+        # Health polls carry Sampled=0 so they don't flood the trace stream
+        response = await client.get(f"{BASE_URL}/health", headers=UNSAMPLED_HEADERS, timeout=HEALTH_TIMEOUT)
+        
+        if response.status_code == 200:
+            health_data = orjson.loads(response.content)
+            print_success(f"Main backend is healthy: {health_data.get('status')}")
             
-            if response.status_code == 200:
-                health_data = response.json()
-                print_success(f"Main backend is healthy: {health_data.get('status')}")
-                
-                # Check X-Ray headers
-                trace_id = response.headers.get("X-Amzn-Trace-Id")
-                if trace_id:
-                    print_success(f"X-Ray trace ID present: {trace_id[:50]}...")
-                else:
-                    print_info("X-Ray trace ID not in response headers (may be in daemon)")
-                
-                return True
+            # Check X-Ray headers
+            trace_id = response.headers.get("X-Amzn-Trace-Id")
+            if trace_id:
+                print_success(f"X-Ray trace ID present: {trace_id[:50]}...")
             else:
-                print_error(f"Health check failed: {response.status_code}")
-                return False
-                
+                print_info("X-Ray trace ID not in response headers (may be in daemon)")
+            
+            return True
+        else:
+            print_error(f"Main backend health check failed: {response.status_code}")
+            return False
+            
     except Exception as e:
-        print_error(f"Health check error: {e}")
+        print_error(f"Main backend health check error: {e}")
         return False
 
 
-async def test_model_server_health():
+@buffered_output
+async def test_model_server_health(client: httpx.AsyncClient):
     """Test 3: Model server health check with X-Ray"""
     print_test("Model Server Health Check")
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{MODEL_SERVER_URL}/health", timeout=10.0)
+        response = await client.get(f"{MODEL_SERVER_URL}/health", headers=UNSAMPLED_HEADERS, timeout=HEALTH_TIMEOUT)
+        
+        if response.status_code == 200:
+            health_data = orjson.loads(response.content)
+            print_success(f"Model server is healthy: {health_data.get('status')}")
+            
+            # Check models loaded
+            models = health_data.get("models_loaded", {})
+            print_info(f"Models loaded: {sum(models.values())}/{len(models)}")
+            
+            return True
+        else:
+            print_error(f"Model server health check failed: {response.status_code}")
+            return False
             
-            if response.status_code == 200:
-                health_data = response.json()
-                print_success(f"Model server is healthy: {health_data.get('status')}")
-                
-                # Check models loaded
-                models = health_data.get("models_loaded", {})
-                print_info(f"Models loaded: {sum(models.values())}/{len(models)}")
-                
-                return True
-            else:
-                print_error(f"Health check failed: {response.status_code}")
-                return False
-                
     except Exception as e:
-        print_error(f"Health check error: {e}")
+        print_error(f"Model server health check error: {e}")
         return False
 
 
-async def test_asr_ocr_server_health():
+@buffered_output
+async def test_asr_ocr_server_health(client: httpx.AsyncClient):
     """Test 4: ASR/OCR server health check with X-Ray"""
     print_test("ASR/OCR Server Health Check")
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{ASR_OCR_SERVER_URL}/health", timeout=10.0)
+        response = await client.get(f"{ASR_OCR_SERVER_URL}/health", headers=UNSAMPLED_HEADERS, timeout=HEALTH_TIMEOUT)
+        
+        if response.status_code == 200:
+            health_data = orjson.loads(response.content)
+            print_success(f"ASR/OCR server is healthy: {health_data.get('status')}")
+            
+            # Check models loaded
+            models = health_data.get("models", {})
+            print_info(f"Models loaded: {sum(models.values())}/{len(models)}")
+            
+            return True
+        else:
+            print_error(f"ASR/OCR server health check failed: {response.status_code}")
+            return False
             
-            if response.status_code == 200:
-                health_data = response.json()
-                print_success(f"ASR/OCR server is healthy: {health_data.get('status')}")
-                
-                # Check models loaded
-                models = health_data.get("models", {})
-                print_info(f"Models loaded: {sum(models.values())}/{len(models)}")
-                
-                return True
-            else:
-                print_error(f"Health check failed: {response.status_code}")
-                return False
-                
     except Exception as e:
-        print_error(f"Health check error: {e}")
+        print_error(f"ASR/OCR server health check error: {e}")
         return False
 
 
-async def test_fir_processing_with_tracing():
+@buffered_output
+async def test_fir_processing_with_tracing(client: httpx.AsyncClient):
     """Test 5: FIR processing with X-Ray tracing"""
     print_test("FIR Processing with X-Ray Tracing")
     
     try:
-        async with httpx.AsyncClient() as client:
-            # Create a test FIR request
-            test_text = "I want to report a theft. Someone stole my laptop from my office yesterday."
+        # Create a test FIR request
+        test_text = "I want to report a theft. Someone stole my laptop from my office yesterday."
+        
+        print_info("Sending FIR processing request...")
+        start = time.perf_counter_ns()
+        
+        response = await client.post(
+            f"{BASE_URL}/process",
+            headers={"X-API-Key": API_KEY},
+            data={"text": test_text},
+            timeout=PROCESS_TIMEOUT
+        )
+        
+        duration_ms = (time.perf_counter_ns() - start) / 1e6
+        
+        if response.status_code == 200:
+            result = orjson.loads(response.content)
+            print_success(f"FIR processing initiated: {result.get('session_id')}")
+            print_info(f"Processing time: {duration_ms:.1f}ms")
             
-            print_info("Sending FIR processing request...")
-            start_time = time.time()
+            # Check for trace ID
+            trace_id = response.headers.get("X-Amzn-Trace-Id")
+            if trace_id:
+                print_success(f"X-Ray trace ID: {trace_id[:50]}...")
+                print_info("Check AWS X-Ray console for full trace details")
             
-            response = await client.post(
-                f"{BASE_URL}/process",
-                headers={"X-API-Key": API_KEY},
-                data={"text": test_text},
-                timeout=60.0
-            )
+            return True
+        else:
+            print_error(f"FIR processing failed: {response.status_code}")
+            print_error(f"Response: {response.text}")
+            return False
             
-            duration = time.time() - start_time
-            
-            if response.status_code == 200:
-                result = response.json()
-                print_success(f"FIR processing initiated: {result.get('session_id')}")
-                print_info(f"Processing time: {duration:.2f}s")
-                
-                # Check for trace ID
-                trace_id = response.headers.get("X-Amzn-Trace-Id")
-                if trace_id:
-                    print_success(f"X-Ray trace ID: {trace_id[:50]}...")
-                    print_info("Check AWS X-Ray console for full trace details")
-                
-                return True
-            else:
-                print_error(f"FIR processing failed: {response.status_code}")
-                print_error(f"Response: {response.text}")
-                return False
-                
     except Exception as e:
         print_error(f"FIR processing error: {e}")
         return False
 
 
-async def test_concurrent_requests_tracing():
+@buffered_output
+async def test_concurrent_requests_tracing(
+    client: httpx.AsyncClient,
+    num_requests: int = DEFAULT_CONCURRENCY,
+    sampling_rate: float = DEFAULT_SAMPLING_RATE,
+):
     """Test 6: Concurrent requests with X-Ray tracing"""
     print_test("Concurrent Requests with X-Ray Tracing")
     
     try:
-        async with httpx.AsyncClient() as client:
-            # Create multiple concurrent requests
-            num_requests = 5
-            test_texts = [
-                f"Test complaint {i}: Reporting an incident that occurred today."
-                for i in range(num_requests)
-            ]
-            
-            print_info(f"Sending {num_requests} concurrent requests...")
-            start_time = time.time()
-            
-            tasks = [
-                client.post(
-                    f"{BASE_URL}/process",
-                    headers={"X-API-Key": API_KEY},
-                    data={"text": text},
-                    timeout=60.0
-                )
-                for text in test_texts
-            ]
-            
-            responses = await asyncio.gather(*tasks, return_exceptions=True)
-            duration = time.time() - start_time
-            
-            # Count successes
-            successes = sum(1 for r in responses if not isinstance(r, Exception) and r.status_code == 200)
+        # Create multiple concurrent requests
+        test_texts = [
+            f"Test complaint {i}: Reporting an incident that occurred today."
+            for i in range(num_requests)
+        ]
+        
+        # Only trace a subset sized by the sampling rate; the rest opt out
+        num_traced = max(1, round(num_requests * sampling_rate))
+        
+        print_info(f"Sending {num_requests} concurrent requests ({num_traced} traced)...")
+        start = time.perf_counter_ns()
+        
+        # Bound in-flight requests so large bursts don't flood the event loop
+        semaphore = asyncio.Semaphore(MAX_IN_FLIGHT)
+        
+        async def send(text: str, traced: bool):
+            headers = {"X-API-Key": API_KEY, **(SAMPLED_HEADERS if traced else UNSAMPLED_HEADERS)}
+            async with semaphore:
+                try:
+                    response = await client.post(
+                        f"{BASE_URL}/process",
+                        headers=headers,
+                        data={"text": text},
+                        timeout=PROCESS_TIMEOUT
+                    )
+                    # Hand the connection back to the keep-alive pool right away
+                    await response.aclose()
+                    return response
+                except Exception as e:
+                    # Keep failures as results so one error doesn't cancel the group
+                    return e
+        
+        async with asyncio.TaskGroup() as tg:
+            tasks = [tg.create_task(send(text, i < num_traced)) for i, text in enumerate(test_texts)]
+        responses = [task.result() for task in tasks]
+        duration_ms = (time.perf_counter_ns() - start) / 1e6
+        
+        # Count successes
+        ok = [r for r in responses if not isinstance(r, BaseException)]
+        successes = sum(r.status_code == 200 for r in ok)
+        
+        print_info(f"Completed {successes}/{num_requests} requests in {duration_ms:.1f}ms")
+        
+        if successes == num_requests:
+            print_success("All concurrent requests succeeded")
+            print_info("Check AWS X-Ray service map to see concurrent traces")
+            return True
+        else:
+            print_error(f"Only {successes}/{num_requests} requests succeeded")
+            return False
             
-            print_info(f"Completed {successes}/{num_requests} requests in {duration:.2f}s")
-            
-            if successes == num_requests:
-                print_success("All concurrent requests succeeded")
-                print_info("Check AWS X-Ray service map to see concurrent traces")
-                return True
-            else:
-                print_error(f"Only {successes}/{num_requests} requests succeeded")
-                return False
-                
     except Exception as e:
         print_error(f"Concurrent requests error: {e}")
         return False
 
 
-async def test_error_tracing():
+@buffered_output
+async def test_error_tracing(client: httpx.AsyncClient):
     """Test 7: Error tracing with X-Ray"""
     print_test("Error Tracing with X-Ray")
     
     try:
-        async with httpx.AsyncClient() as client:
-            # Send request without API key (should fail)
-            print_info("Sending request without API key (expected to fail)...")
+        # Send request without API key (should fail)
+        print_info("Sending request without API key (expected to fail)...")
+        
+        response = await client.post(
+            f"{BASE_URL}/process",
+            data={"text": "Test"}
+        )
+        
+        if response.status_code == 401:
+            print_success("Authentication error correctly returned")
             
-            response = await client.post(
-                f"{BASE_URL}/process",
-                data={"text": "Test"},
-                timeout=10.0
-            )
+            # Check for trace ID
+            trace_id = response.headers.get("X-Amzn-Trace-Id")
+            if trace_id:
+                print_success(f"Error trace ID: {trace_id[:50]}...")
+                print_info("Check AWS X-Ray console for error trace")
+            
+            return True
+        else:
+            print_error(f"Unexpected status code: {response.status_code}")
+            return False
             
-            if response.status_code == 401:
-                print_success("Authentication error correctly returned")
-                
-                # Check for trace ID
-                trace_id = response.headers.get("X-Amzn-Trace-Id")
-                if trace_id:
-                    print_success(f"Error trace ID: {trace_id[:50]}...")
-                    print_info("Check AWS X-Ray console for error trace")
-                
-                return True
-            else:
-                print_error(f"Unexpected status code: {response.status_code}")
-                return False
-                
     except Exception as e:
         print_error(f"Error tracing test error: {e}")
         return False
 
 
+@buffered_output
 async def test_xray_annotations():
     """Test 8: Verify X-Ray annotations are being added"""
     print_test("X-Ray Annotations")
@@ -290,72 +364,97 @@ async def test_xray_annotations():
     print_info('  annotation.endpoint = "/process"')
     print_info('  annotation.model_name = "summariser"')
     print_info('  annotation.error = true')
+    print_info("Tail-sampling policies keep every trace whose segment has:")
+    print_info("  http.response.status >= 400 (recorded by the X-Ray middleware)")
+    print_info("  the error or fault flag set")
     
     return True
 
 
 def print_summary(results: dict):
     """Print test summary"""
-    print(f"\n{BLUE}{'='*60}{RESET}")
-    print(f"{BLUE}Test Summary{RESET}")
-    print(f"{BLUE}{'='*60}{RESET}")
-    
     total = len(results)
     passed = sum(1 for r in results.values() if r)
     failed = total - passed
     
-    print(f"\nTotal Tests: {total}")
-    print(f"{GREEN}Passed: {passed}{RESET}")
-    print(f"{RED}Failed: {failed}{RESET}")
-    
-    print(f"\n{BLUE}Test Results:{RESET}")
+    lines = [
+        f"\n{BLUE}{'='*60}{RESET}",
+        f"{BLUE}Test Summary{RESET}",
+        f"{BLUE}{'='*60}{RESET}",
+        f"\nTotal Tests: {total}",
+        f"{GREEN}Passed: {passed}{RESET}",
+        f"{RED}Failed: {failed}{RESET}",
+        f"\n{BLUE}Test Results:{RESET}",
+    ]
     for test_name, result in results.items():
         status = f"{GREEN}PASS{RESET}" if result else f"{RED}FAIL{RESET}"
-        print(f"  {status} - {test_name}")
+        lines.append(f"  {status} - {test_name}")
     
-    print(f"\n{BLUE}{'='*60}{RESET}")
+    lines.append(f"\n{BLUE}{'='*60}{RESET}")
     
     if failed == 0:
-        print(f"{GREEN}✓ All tests passed!{RESET}")
-        print(f"\n{YELLOW}Next Steps:{RESET}")
-        print("1. Check AWS X-Ray console for traces")
-        print("2. View service map to see dependencies")
-        print("3. Search traces by annotations")
-        print("4. Analyze performance metrics")
+        lines += [
+            f"{GREEN}✓ All tests passed!{RESET}",
+            f"\n{YELLOW}Next Steps:{RESET}",
+            "1. Check AWS X-Ray console for traces",
+            "2. View service map to see dependencies",
+            "3. Search traces by annotations",
+            "4. Analyze performance metrics",
+        ]
     else:
-        print(f"{RED}✗ Some tests failed{RESET}")
-        print(f"\n{YELLOW}Troubleshooting:{RESET}")
-        print("1. Verify X-Ray daemon is running")
-        print("2. Check IAM permissions for X-Ray")
-        print("3. Review application logs for errors")
-        print("4. Ensure XRAY_ENABLED=true")
+        lines += [
+            f"{RED}✗ Some tests failed{RESET}",
+            f"\n{YELLOW}Troubleshooting:{RESET}",
+            "1. Verify X-Ray daemon is running",
+            "2. Check IAM permissions for X-Ray",
+            "3. Review application logs for errors",
+            "4. Ensure XRAY_ENABLED=true",
+        ]
     
-    print(f"{BLUE}{'='*60}{RESET}\n")
+    lines.append(f"{BLUE}{'='*60}{RESET}\n")
+    emit("\n".join(lines) + "\n")
     
     return failed == 0
 
 
-async def main():
+async def main(concurrency: int = DEFAULT_CONCURRENCY, sampling_rate: float = DEFAULT_SAMPLING_RATE):
     """Run all tests"""
-    print(f"\n{BLUE}{'='*60}{RESET}")
-    print(f"{BLUE}AWS X-Ray Distributed Tracing - Test Suite{RESET}")
-    print(f"{BLUE}{'='*60}{RESET}")
-    print(f"Timestamp: {datetime.now().isoformat()}")
-    print(f"Base URL: {BASE_URL}")
-    print(f"Model Server: {MODEL_SERVER_URL}")
-    print(f"ASR/OCR Server: {ASR_OCR_SERVER_URL}")
+    emit(
+        f"\n{BLUE}{'='*60}{RESET}\n"
+        f"{BLUE}AWS X-Ray Distributed Tracing - Test Suite{RESET}\n"
+        f"{BLUE}{'='*60}{RESET}\n"
+        f"Timestamp: {datetime.now().isoformat()}\n"
+        f"Base URL: {BASE_URL}\n"
+        f"Model Server: {MODEL_SERVER_URL}\n"
+        f"ASR/OCR Server: {ASR_OCR_SERVER_URL}\n"
+    )
     
     results = {}
     
-    # Run tests
-    results["X-Ray Configuration"] = await test_xray_configuration()
-    results["Main Backend Health"] = await test_main_backend_health()
-    results["Model Server Health"] = await test_model_server_health()
-    results["ASR/OCR Server Health"] = await test_asr_ocr_server_health()
-    results["FIR Processing with Tracing"] = await test_fir_processing_with_tracing()
-    results["Concurrent Requests Tracing"] = await test_concurrent_requests_tracing()
-    results["Error Tracing"] = await test_error_tracing()
-    results["X-Ray Annotations"] = await test_xray_annotations()
+    # One pooled client for the whole suite so connections are reused across tests
+    async with httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=100, max_connections=1000),
+        timeout=HEALTH_TIMEOUT,
+    ) as client:
+        # Run tests
+        results["X-Ray Configuration"] = await test_xray_configuration(sampling_rate)
+        
+        # Health checks are independent, so run them concurrently
+        (
+            results["Main Backend Health"],
+            results["Model Server Health"],
+            results["ASR/OCR Server Health"],
+        ) = await asyncio.gather(
+            test_main_backend_health(client),
+            test_model_server_health(client),
+            test_asr_ocr_server_health(client),
+        )
+        
+        results["FIR Processing with Tracing"] = await test_fir_processing_with_tracing(client)
+        results["Concurrent Requests Tracing"] = await test_concurrent_requests_tracing(client, concurrency, sampling_rate)
+        results["Error Tracing"] = await test_error_tracing(client)
+        results["X-Ray Annotations"] = await test_xray_annotations()
     
     # Print summary
     success = print_summary(results)
@@ -364,5 +463,21 @@ async def main():
 
 
 if __name__ == "__main__":
-    exit_code = asyncio.run(main())
+    parser = argparse.ArgumentParser(description="AWS X-Ray tracing test suite")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help="Number of simultaneous requests in the concurrent tracing test"
+    )
+    args = parser.parse_args()
+    
+    # Parsed here rather than at import so a malformed value gets a usage error, not a traceback
+    raw_sampling_rate = os.getenv("XRAY_SAMPLING_RATE")
+    try:
+        sampling_rate = DEFAULT_SAMPLING_RATE if raw_sampling_rate is None else float(raw_sampling_rate)
+    except ValueError:
+        parser.error(f"XRAY_SAMPLING_RATE must be a number, got {raw_sampling_rate!r}")
+    
+    exit_code = asyncio.run(main(args.concurrency, sampling_rate))
     sys.exit(exit_code)
@@ -6,13 +6,22 @@ This test validates that no data is lost when the service is restarted,
 including during in-flight transactions and graceful shutdown.
 """
 
-import subprocess
+import asyncio
+import atexit
+import io
+import os
 import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import sys
+import docker
 import mysql.connector
+import mysql.connector.pooling
 import sqlite3
+import threading
+from contextvars import ContextVar
 from datetime import datetime
 from pathlib import Path
 
@@ -26,6 +35,38 @@ MYSQL_CONFIG = {
     "database": "fir_db"
 }
 SESSION_DB_PATH = "./sessions.db"
+MYSQL_POOL_SIZE = 5
+SERVICE_NAME = "fir_pipeline"
+SERVICE_STOP_TIMEOUT = 30
+
+# Readiness polling: back off from MIN_POLL_INTERVAL up to MAX_POLL_INTERVAL
+WAIT_TIMEOUT = float(os.getenv("WAIT_TIMEOUT", "60"))
+MIN_POLL_INTERVAL = max(0.05, float(os.getenv("MIN_POLL_INTERVAL", "0.1")))
+MAX_POLL_INTERVAL = 2.0
+
+# Health payloads younger than this are reused instead of re-requested
+HEALTH_CACHE_TTL = 2.0
+
+# Keep-alive HTTP session shared by health polls, FIR creation and status checks. Worker
+# threads share it only for plain requests: the thread-safe urllib3 pool does the work and
+# nothing mutates the session's cookies, headers or adapters after this setup
+SESSION = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    max_retries=Retry(total=3, backoff_factor=0.1)
+)
+SESSION.mount("http://", _adapter)
+SESSION.mount("https://", _adapter)
+
+# Connections are created on first use and reused across tests
+_mysql_pool = None
+_session_conn = None
+_docker_client = None
+_conn_lock = threading.Lock()
+
+# (monotonic timestamp, payload) of the last successful /health response
+_health_cache = None
 
 class Colors:
     GREEN = '\033[92m'
@@ -34,56 +75,113 @@ class Colors:
     BLUE = '\033[94m'
     END = '\033[0m'
 
+# Output buffer of the test running in the current task (and the threads it starts via
+# asyncio.to_thread, which copy the context); None means print directly
+_output = ContextVar("_output", default=None)
+
+def emit(line):
+    """Print a line, or buffer it when the running test is capturing output"""
+    buf = _output.get()
+    if buf is None:
+        print(line)
+    else:
+        buf.write(line + "\n")
+
 def print_test(name):
-    print(f"\n{Colors.BLUE}[TEST]{Colors.END} {name}")
+    emit(f"\n{Colors.BLUE}[TEST]{Colors.END} {name}")
 
 def print_success(message):
-    print(f"{Colors.GREEN}✓{Colors.END} {message}")
+    emit(f"{Colors.GREEN}✓{Colors.END} {message}")
 
 def print_error(message):
-    print(f"{Colors.RED}✗{Colors.END} {message}")
+    emit(f"{Colors.RED}✗{Colors.END} {message}")
 
 def print_warning(message):
-    print(f"{Colors.YELLOW}⚠{Colors.END} {message}")
+    emit(f"{Colors.YELLOW}⚠{Colors.END} {message}")
 
-def wait_for_service(timeout=60):
+def _get_health(ttl=HEALTH_CACHE_TTL):
+    """Get the /health payload, reusing a response fetched within the last ttl seconds"""
+    global _health_cache
+    cached = _health_cache
+    if cached is not None and time.monotonic() - cached[0] < ttl:
+        return cached[1]
+    
+    response = SESSION.get(f"{BASE_URL}/health", timeout=5)
+    response.raise_for_status()
+    health = response.json()
+    _health_cache = (time.monotonic(), health)
+    return health
+
+def wait_for_service(timeout=WAIT_TIMEOUT):
     """Wait for the service to be ready"""
     print_test("Waiting for service to be ready...")
-    start_time = time.time()
+    start_time = time.monotonic()
+    delay = MIN_POLL_INTERVAL
+    use_head = True
     
-    while time.time() - start_time < timeout:
+    while time.monotonic() - start_time < timeout:
         try:
-            response = requests.get(f"{BASE_URL}/health", timeout=5)
-            if response.status_code == 200:
-                health = response.json()
+            # Cheap HEAD liveness probe; only parse the health payload once it answers
+            if use_head:
+                probe = SESSION.head(f"{BASE_URL}/health", timeout=5)
+                if probe.status_code == 405:
+                    use_head = False
+            if not use_head or probe.status_code == 200:
+                health = _get_health()
                 if health.get("status") in ["healthy", "degraded"]:
                     print_success(f"Service is ready (status: {health.get('status')})")
                     return True
         except requests.exceptions.RequestException:
             pass
-        time.sleep(2)
+        time.sleep(delay)
+        delay = min(delay * 1.5, MAX_POLL_INTERVAL)
     
     print_error("Service did not become ready in time")
     return False
 
 def get_mysql_connection():
-    """Get MySQL database connection"""
+    """Get a pooled MySQL connection (close() returns it to the pool)"""
+    global _mysql_pool
     try:
-        conn = mysql.connector.connect(**MYSQL_CONFIG)
-        return conn
+        with _conn_lock:
+            if _mysql_pool is None:
+                _mysql_pool = mysql.connector.pooling.MySQLConnectionPool(
+                    pool_name="zero_data_loss_test",
+                    pool_size=MYSQL_POOL_SIZE,
+                    **MYSQL_CONFIG
+                )
+        return _mysql_pool.get_connection()
     except Exception as e:
         print_error(f"Failed to connect to MySQL: {e}")
         return None
 
 def get_session_connection():
-    """Get SQLite session database connection"""
+    """Get the shared SQLite session database connection (closed at exit, do not close)"""
+    global _session_conn
     try:
-        conn = sqlite3.connect(SESSION_DB_PATH)
-        return conn
+        with _conn_lock:
+            if _session_conn is None:
+                _session_conn = sqlite3.connect(SESSION_DB_PATH, check_same_thread=False)
+        return _session_conn
     except Exception as e:
         print_error(f"Failed to connect to session database: {e}")
         return None
 
+def close_connections():
+    """Close the shared session database connection, Docker client and HTTP session"""
+    global _session_conn, _docker_client
+    with _conn_lock:
+        if _session_conn is not None:
+            _session_conn.close()
+            _session_conn = None
+        if _docker_client is not None:
+            _docker_client.close()
+            _docker_client = None
+    SESSION.close()
+
+# Runs on every exit path, including the sys.exit() calls in main
+atexit.register(close_connections)
+
 def count_fir_records():
     """Count FIR records in database"""
     conn = get_mysql_connection()
@@ -115,8 +213,6 @@ def count_sessions():
     except Exception as e:
         print_error(f"Failed to count sessions: {e}")
         return None
-    finally:
-        conn.close()
 
 def get_fir_by_number(fir_number):
     """Get FIR record by number"""
@@ -158,13 +254,11 @@ def get_session_by_id(session_id):
     except Exception as e:
         print_error(f"Failed to get session: {e}")
         return None
-    finally:
-        conn.close()
 
 def create_test_fir():
     """Create a test FIR"""
     try:
-        response = requests.post(
+        response = SESSION.post(
             f"{BASE_URL}/process",
             data={"text": "Test complaint for zero data loss validation. A theft occurred at the market."},
             timeout=30
@@ -181,36 +275,46 @@ def create_test_fir():
         print_error(f"Failed to create test FIR: {e}")
         return None
 
+def get_service_container():
+    """Get the compose-managed service container over a shared docker daemon connection"""
+    global _docker_client
+    with _conn_lock:
+        if _docker_client is None:
+            _docker_client = docker.from_env()
+    containers = _docker_client.containers.list(
+        all=True,
+        filters={"label": f"com.docker.compose.service={SERVICE_NAME}"}
+    )
+    if not containers:
+        raise docker.errors.NotFound(f"No container found for service {SERVICE_NAME}")
+    return containers[0]
+
 def restart_service():
     """Restart the main backend service"""
+    global _health_cache
     print_test("Restarting service...")
     
     try:
+        container = get_service_container()
+        
         # Stop the service
-        subprocess.run(
-            ["docker-compose", "stop", "fir_pipeline"],
-            cwd=".",
-            check=True,
-            capture_output=True
-        )
+        container.stop(timeout=SERVICE_STOP_TIMEOUT)
         print_success("Service stopped")
         
+        # Never let a pre-restart health payload satisfy the readiness wait
+        _health_cache = None
+        
         # Wait a moment
         time.sleep(2)
         
         # Start the service
-        subprocess.run(
-            ["docker-compose", "start", "fir_pipeline"],
-            cwd=".",
-            check=True,
-            capture_output=True
-        )
+        container.start()
         print_success("Service started")
         
         # Wait for service to be ready
         return wait_for_service()
         
-    except subprocess.CalledProcessError as e:
+    except docker.errors.DockerException as e:
         print_error(f"Failed to restart service: {e}")
         return False
 
@@ -252,20 +356,23 @@ def test_mysql_durability_settings():
     try:
         cursor = conn.cursor()
         
+        # Fetch all durability variables in a single round trip
+        cursor.execute(
+            "SHOW VARIABLES WHERE Variable_name IN "
+            "('innodb_flush_log_at_trx_commit', 'sync_binlog', 'innodb_doublewrite')"
+        )
+        variables = dict(cursor.fetchall())
+        
         # Check innodb_flush_log_at_trx_commit (should be 1 for durability)
-        cursor.execute("SHOW VARIABLES LIKE 'innodb_flush_log_at_trx_commit'")
-        result = cursor.fetchone()
-        flush_log = int(result[1]) if result else None
+        flush_log = variables.get("innodb_flush_log_at_trx_commit")
+        flush_log = int(flush_log) if flush_log is not None else None
         
         # Check sync_binlog (should be 1 for durability)
-        cursor.execute("SHOW VARIABLES LIKE 'sync_binlog'")
-        result = cursor.fetchone()
-        sync_binlog = int(result[1]) if result else None
+        sync_binlog = variables.get("sync_binlog")
+        sync_binlog = int(sync_binlog) if sync_binlog is not None else None
         
         # Check innodb_doublewrite (should be ON for durability)
-        cursor.execute("SHOW VARIABLES LIKE 'innodb_doublewrite'")
-        result = cursor.fetchone()
-        doublewrite = result[1] if result else None
+        doublewrite = variables.get("innodb_doublewrite")
         
         all_good = True
         
@@ -299,17 +406,20 @@ def test_sqlite_wal_mode():
     """Test that SQLite is using WAL mode"""
     print_test("Testing SQLite WAL mode...")
     
-    conn = get_session_connection()
-    if not conn:
+    # Read-only connection so the check can't take a write lock on the live session DB
+    try:
+        conn = sqlite3.connect(f"{Path(SESSION_DB_PATH).resolve().as_uri()}?mode=ro", uri=True)
+    except Exception as e:
+        print_error(f"Failed to connect to session database: {e}")
         return False
     
     try:
-        cursor = conn.cursor()
-        cursor.execute("PRAGMA journal_mode")
-        journal_mode = cursor.fetchone()[0]
+        conn.execute("PRAGMA query_only = 1")
         
-        cursor.execute("PRAGMA synchronous")
-        synchronous = cursor.fetchone()[0]
+        # Read both settings in one statement via the PRAGMA table-valued functions
+        journal_mode, synchronous = conn.execute(
+            "SELECT * FROM pragma_journal_mode, pragma_synchronous"
+        ).fetchone()
         
         if journal_mode.upper() == "WAL":
             print_success(f"SQLite journal_mode = {journal_mode} (optimal for crash recovery)")
@@ -331,13 +441,21 @@ def test_sqlite_wal_mode():
     finally:
         conn.close()
 
-def test_data_persistence_after_restart():
+async def count_records():
+    """Count FIR records (MySQL) and sessions (SQLite) concurrently"""
+    results = await asyncio.gather(
+        asyncio.to_thread(count_fir_records),
+        asyncio.to_thread(count_sessions),
+        return_exceptions=True
+    )
+    return tuple(None if isinstance(r, BaseException) else r for r in results)
+
+async def test_data_persistence_after_restart():
     """Test that data persists after service restart"""
     print_test("Testing data persistence after restart...")
     
     # Count records before
-    fir_count_before = count_fir_records()
-    session_count_before = count_sessions()
+    fir_count_before, session_count_before = await count_records()
     
     if fir_count_before is None or session_count_before is None:
         print_error("Failed to count records before restart")
@@ -346,7 +464,7 @@ def test_data_persistence_after_restart():
     print_success(f"Before restart: {fir_count_before} FIRs, {session_count_before} sessions")
     
     # Create a test FIR
-    session_id = create_test_fir()
+    session_id = await asyncio.to_thread(create_test_fir)
     if not session_id:
         print_error("Failed to create test FIR")
         return False
@@ -354,22 +472,20 @@ def test_data_persistence_after_restart():
     print_success(f"Created test FIR with session: {session_id}")
     
     # Wait for data to be written
-    time.sleep(2)
+    await asyncio.sleep(2)
     
     # Count records after creation
-    fir_count_after_create = count_fir_records()
-    session_count_after_create = count_sessions()
+    fir_count_after_create, session_count_after_create = await count_records()
     
     print_success(f"After creation: {fir_count_after_create} FIRs, {session_count_after_create} sessions")
     
     # Restart service
-    if not restart_service():
+    if not await asyncio.to_thread(restart_service):
         print_error("Failed to restart service")
         return False
     
     # Count records after restart
-    fir_count_after_restart = count_fir_records()
-    session_count_after_restart = count_sessions()
+    fir_count_after_restart, session_count_after_restart = await count_records()
     
     if fir_count_after_restart is None or session_count_after_restart is None:
         print_error("Failed to count records after restart")
@@ -378,7 +494,7 @@ def test_data_persistence_after_restart():
     print_success(f"After restart: {fir_count_after_restart} FIRs, {session_count_after_restart} sessions")
     
     # Verify session persisted
-    session = get_session_by_id(session_id)
+    session = await asyncio.to_thread(get_session_by_id, session_id)
     if session:
         print_success(f"Session {session_id} persisted after restart")
     else:
@@ -399,7 +515,7 @@ def test_graceful_shutdown_timeout():
     print_test("Testing graceful shutdown configuration...")
     
     try:
-        response = requests.get(f"{BASE_URL}/reliability", timeout=5)
+        response = SESSION.get(f"{BASE_URL}/reliability", timeout=5)
         if response.status_code == 200:
             data = response.json()
             shutdown_status = data.get("graceful_shutdown", {})
@@ -425,24 +541,68 @@ def test_flush_methods_exist():
     # This is a code inspection test - we check if the methods exist
     # by looking at the health endpoint which should include database status
     try:
-        response = requests.get(f"{BASE_URL}/health", timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            
-            # Check if database is connected (indicates DB class is working)
-            if data.get("database") == "connected":
-                print_success("Database connection active (flush methods available)")
-                return True
-            else:
-                print_error("Database not connected")
-                return False
+        data = _get_health()
+        
+        # Check if database is connected (indicates DB class is working)
+        if data.get("database") == "connected":
+            print_success("Database connection active (flush methods available)")
+            return True
         else:
-            print_error(f"Failed to get health status: {response.status_code}")
+            print_error("Database not connected")
             return False
+    except requests.exceptions.HTTPError as e:
+        print_error(f"Failed to get health status: {e.response.status_code}")
+        return False
     except Exception as e:
         print_error(f"Failed to check flush methods: {e}")
         return False
 
+async def run_test(test_name, test):
+    """Await a test, recording an exception as a failure"""
+    try:
+        return test_name, await test
+    except Exception as e:
+        print_error(f"Test '{test_name}' raised exception: {e}")
+        return test_name, False
+
+async def run_captured(test_name, test_func):
+    """Run a blocking test in a worker thread with its output captured
+    
+    Returns (test_name, result, output). gather runs each call in its own task, so the
+    buffer set here is private to this test and inherited by its worker thread.
+    """
+    buf = io.StringIO()
+    _output.set(buf)
+    name, result = await run_test(test_name, asyncio.to_thread(test_func))
+    return name, result, buf.getvalue()
+
+async def run_tests():
+    """Run the read-only inspections concurrently, then the restart test on its own"""
+    independent_tests = [
+        ("Transaction Atomicity", test_transaction_atomicity),
+        ("MySQL Durability Settings", test_mysql_durability_settings),
+        ("SQLite WAL Mode", test_sqlite_wal_mode),
+        ("Graceful Shutdown Timeout", test_graceful_shutdown_timeout),
+        ("Flush Methods Implementation", test_flush_methods_exist),
+    ]
+    
+    # These only inspect configuration and state, so they have no ordering constraints.
+    # Their output is buffered and printed in list order once all have finished
+    captured = await asyncio.gather(*(
+        run_captured(test_name, test_func)
+        for test_name, test_func in independent_tests
+    ))
+    
+    results = []
+    for test_name, result, output in captured:
+        sys.stdout.write(output)
+        results.append((test_name, result))
+    
+    # Restarting the service disturbs everything else, so it runs last and alone
+    results.append(await run_test("Data Persistence After Restart", test_data_persistence_after_restart()))
+    
+    return results
+
 def main():
     print("\n" + "=" * 60)
     print("Zero Data Loss on Service Restart - Test Suite")
@@ -454,23 +614,7 @@ def main():
         sys.exit(1)
     
     # Run tests
-    tests = [
-        ("Transaction Atomicity", test_transaction_atomicity),
-        ("MySQL Durability Settings", test_mysql_durability_settings),
-        ("SQLite WAL Mode", test_sqlite_wal_mode),
-        ("Graceful Shutdown Timeout", test_graceful_shutdown_timeout),
-        ("Flush Methods Implementation", test_flush_methods_exist),
-        ("Data Persistence After Restart", test_data_persistence_after_restart),
-    ]
-    
-    results = []
-    for test_name, test_func in tests:
-        try:
-            result = test_func()
-            results.append((test_name, result))
-        except Exception as e:
-            print_error(f"Test '{test_name}' raised exception: {e}")
-            results.append((test_name, False))
+    results = asyncio.run(run_tests())
     
     # Print summary
     print("\n" + "=" * 60)
@@ -6,72 +6,241 @@ Validates all changes are working correctly
 
 import asyncio
 import httpx
+import io
+import os
 import time
-import json
-from typing import Dict, List
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, fields
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+# Try orjson first, then ujson, then the stdlib json module
+try:
+    import orjson
+
+    json_loads = orjson.loads
+
+    def json_dumps_pretty(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE)
+except ImportError:
+    try:
+        import ujson as json
+    except ImportError:
+        import json
+
+    json_loads = json.loads
+
+    def json_dumps_pretty(obj) -> bytes:
+        return (json.dumps(obj, indent=2) + "\n").encode()
+
+# msgspec decodes straight into the typed records below, skipping fields they don't declare
+try:
+    import msgspec
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    MSGSPEC_AVAILABLE = False
+
+# httpx decodes Brotli only when the brotli (or brotlicffi) package is installed
+try:
+    import brotli  # noqa: F401
+    BROTLI_AVAILABLE = True
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        BROTLI_AVAILABLE = True
+    except ImportError:
+        BROTLI_AVAILABLE = False
+
+# uvloop's libuv event loop has a lower per-await cost than the default selector loop,
+# which tightens the cached-response timings; it is not available on Windows
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
 
 MAIN_BACKEND_URL = "http://localhost:8000"
 
+# Health, metrics and status payloads are under 1KB, where compression costs more CPU
+# than it saves in bandwidth; only the FIR content body is worth compressing
+SMALL_RESPONSE_ENCODING = "identity"
+CONTENT_ENCODING = "br, gzip" if BROTLI_AVAILABLE else "gzip"
+
+# Output buffer of the test running in the current task; None means print directly
+_output: ContextVar[Optional[io.StringIO]] = ContextVar("_output", default=None)
+
+def emit(line: str = ""):
+    """Print a line, or buffer it when a test is capturing output"""
+    buf = _output.get()
+    if buf is None:
+        print(line)
+    else:
+        buf.write(line + "\n")
+
+@dataclass(frozen=True)
+class HealthStatus:
+    status: Optional[str] = None
+
+@dataclass(frozen=True)
+class ProcessResult:
+    session_id: Optional[str] = None
+
+@dataclass(frozen=True)
+class ValidateResult:
+    completed: bool = False
+    content: Any = None
+
+@dataclass(frozen=True)
+class FIRContent:
+    content: Any = None
+
+def decode_as(content: bytes, record_type):
+    """Decode a JSON body into record_type, keeping only the fields it declares"""
+    if MSGSPEC_AVAILABLE:
+        return msgspec.json.decode(content, type=record_type)
+    data = json_loads(content)
+    return record_type(**{f.name: data[f.name] for f in fields(record_type) if f.name in data})
+
+# Response-time budget for every endpoint, compared as integer nanoseconds
+THRESHOLD_NS = 200_000_000
+
+def _ms(ns: int) -> float:
+    """Convert a perf_counter_ns delta to milliseconds for display"""
+    return ns / 1_000_000
+
+def _elapsed_ns(resp: httpx.Response) -> int:
+    """Round-trip time httpx recorded for a response, in integer nanoseconds"""
+    return resp.elapsed // timedelta(microseconds=1) * 1_000
+
+async def timed(request):
+    """Await a request and return (response, elapsed ns) measured around it alone"""
+    start_ns = time.perf_counter_ns()
+    resp = await request
+    return resp, time.perf_counter_ns() - start_ns
+
 class ValidationTest:
     def __init__(self):
-        self.client = httpx.AsyncClient(timeout=10.0)
+        self.client = httpx.AsyncClient(
+            base_url=MAIN_BACKEND_URL,
+            headers={"Accept-Encoding": SMALL_RESPONSE_ENCODING},
+            timeout=httpx.Timeout(10.0, connect=2.0),
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=30),
+            http2=True
+        )
+        # Cache timings get a client of their own holding a single keep-alive connection, so
+        # the other tests' requests never queue on it or force it to reconnect; the lock keeps
+        # one timing sequence on it at a time
+        self.timing_client = httpx.AsyncClient(
+            base_url=MAIN_BACKEND_URL,
+            headers={"Accept-Encoding": SMALL_RESPONSE_ENCODING},
+            timeout=httpx.Timeout(10.0, connect=2.0),
+            limits=httpx.Limits(max_connections=1, max_keepalive_connections=1, keepalive_expiry=30)
+        )
+        self.timing_lock = asyncio.Lock()
         self.results = {
             "passed": [],
             "failed": [],
-            "warnings": []
+            "warnings": [],
+            "counts": Counter()
         }
+        # Summary lines for failures and warnings, formatted once at log time
+        self.summary_lines = {"failed": [], "warnings": []}
     
     async def __aenter__(self):
+        # Open the pooled connections up front (DNS, TCP handshake); if the backend is down
+        # the health test reports it, so a failure here is ignored
+        try:
+            await asyncio.gather(self.client.head("/health"), self.timing_client.head("/health"))
+        except httpx.HTTPError:
+            pass
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.client.aclose()
+        await asyncio.gather(self.client.aclose(), self.timing_client.aclose())
     
-    def log_pass(self, test_name: str, message: str = ""):
+    # Messages are %-formatted here rather than at the callsite, keeping string building
+    # off the path between back-to-back timed requests
+    def log_pass(self, test_name: str, fmt: str = "", *args):
+        message = fmt % args if args else fmt
         self.results["passed"].append({"test": test_name, "message": message})
-        print(f"✅ {test_name}: {message}")
+        self.results["counts"]["passed"] += 1
+        emit(f"✅ {test_name}: {message}")
     
-    def log_fail(self, test_name: str, message: str):
+    def log_fail(self, test_name: str, fmt: str, *args):
+        message = fmt % args if args else fmt
         self.results["failed"].append({"test": test_name, "message": message})
-        print(f"❌ {test_name}: {message}")
+        self.results["counts"]["failed"] += 1
+        self.summary_lines["failed"].append(f"  ❌ {test_name}: {message}")
+        emit(f"❌ {test_name}: {message}")
     
-    def log_warning(self, test_name: str, message: str):
+    def log_warning(self, test_name: str, fmt: str, *args):
+        message = fmt % args if args else fmt
         self.results["warnings"].append({"test": test_name, "message": message})
-        print(f"⚠️  {test_name}: {message}")
+        self.results["counts"]["warnings"] += 1
+        self.summary_lines["warnings"].append(f"  ⚠️  {test_name}: {message}")
+        emit(f"⚠️  {test_name}: {message}")
+    
+    async def probe(self, path: str) -> httpx.Response:
+        """GET path for timing only, draining the raw body without buffering or decoding it
+        
+        The body is still read off the wire so the keep-alive connection goes back to the pool.
+        """
+        async with self.timing_client.stream("GET", path) as resp:
+            async for _ in resp.aiter_raw():
+                pass
+        return resp
+    
+    async def measure_cached(self, path: str, repeats: int = 2):
+        """Time a first (uncached) GET of path, then repeated GETs that should hit the cache
+        
+        Every request goes over the single warmed connection of timing_client, one after
+        another and never overlapping another test's timings: httpx only speaks HTTP/2 over
+        TLS (there is no h2c), so against the plain-http backend any concurrency would mean
+        extra cold HTTP/1.1 connections whose connect time counts as cache latency. Each
+        repeat is timed from httpx's own per-response clock. Returns the first response, its
+        latency and the slowest cached latency, all latencies in nanoseconds.
+        """
+        async with self.timing_lock:
+            # Discarded HEAD so network-stack warmup isn't credited to the application cache;
+            # HEAD is rejected by routing, so the handler and its caches stay cold
+            await self.timing_client.head(path)
+            
+            first = await self.timing_client.get(path)
+            first.raise_for_status()
+            
+            cached = []
+            for _ in range(repeats):
+                resp = await self.probe(path)
+                resp.raise_for_status()
+                cached.append(resp)
+        
+        return first, _elapsed_ns(first), max(_elapsed_ns(resp) for resp in cached)
     
     async def test_health_endpoint(self) -> bool:
         """Test health endpoint and verify caching"""
         try:
-            # First request (uncached)
-            start = time.perf_counter()
-            resp1 = await self.client.get(f"{MAIN_BACKEND_URL}/health")
-            time1 = (time.perf_counter() - start) * 1000
-            resp1.raise_for_status()
-            
-            # Second request (should be cached)
-            start = time.perf_counter()
-            resp2 = await self.client.get(f"{MAIN_BACKEND_URL}/health")
-            time2 = (time.perf_counter() - start) * 1000
-            resp2.raise_for_status()
+            # First request (uncached), then repeats (should be cached)
+            resp1, time1_ns, time2_ns = await self.measure_cached("/health")
             
             # Verify response structure
-            health = resp1.json()
-            if "status" not in health:
+            health = decode_as(resp1.content, HealthStatus)
+            if health.status is None:
                 self.log_fail("Health Endpoint", "Missing 'status' field")
                 return False
             
             # Check if second request is faster (cached)
-            if time2 < time1:
-                self.log_pass("Health Endpoint Caching", f"Cached request faster: {time1:.2f}ms → {time2:.2f}ms")
+            if time2_ns < time1_ns:
+                self.log_pass("Health Endpoint Caching", "Cached request faster: %.2fms → %.2fms", _ms(time1_ns), _ms(time2_ns))
             else:
-                self.log_warning("Health Endpoint Caching", f"Cached request not faster: {time1:.2f}ms → {time2:.2f}ms")
+                self.log_warning("Health Endpoint Caching", "Cached request not faster: %.2fms → %.2fms", _ms(time1_ns), _ms(time2_ns))
             
             # Check response time
-            if time2 < 200:
-                self.log_pass("Health Endpoint Response Time", f"{time2:.2f}ms < 200ms")
+            if time2_ns < THRESHOLD_NS:
+                self.log_pass("Health Endpoint Response Time", "%.2fms < 200ms", _ms(time2_ns))
                 return True
             else:
-                self.log_fail("Health Endpoint Response Time", f"{time2:.2f}ms >= 200ms")
+                self.log_fail("Health Endpoint Response Time", "%.2fms >= 200ms", _ms(time2_ns))
                 return False
                 
         except Exception as e:
@@ -83,31 +252,21 @@ class ValidationTest:
         try:
             # Create a test session first
             resp = await self.client.post(
-                f"{MAIN_BACKEND_URL}/process",
+                "/process",
                 data={"text": "Test complaint for validation"}
             )
             resp.raise_for_status()
-            result = resp.json()
-            session_id = result.get("session_id")
+            session_id = decode_as(resp.content, ProcessResult).session_id
             
             if not session_id:
                 self.log_fail("Session Creation", "No session_id returned")
                 return False
             
-            # First request (uncached)
-            start = time.perf_counter()
-            resp1 = await self.client.get(f"{MAIN_BACKEND_URL}/session/{session_id}/status")
-            time1 = (time.perf_counter() - start) * 1000
-            resp1.raise_for_status()
-            
-            # Second request (should be cached)
-            start = time.perf_counter()
-            resp2 = await self.client.get(f"{MAIN_BACKEND_URL}/session/{session_id}/status")
-            time2 = (time.perf_counter() - start) * 1000
-            resp2.raise_for_status()
+            # First request (uncached), then repeats (should be cached)
+            resp1, time1_ns, time2_ns = await self.measure_cached(f"/session/{session_id}/status")
             
             # Verify response structure
-            status = resp1.json()
+            status = json_loads(resp1.content)
             if "session_id" not in status or "status" not in status:
                 self.log_fail("Session Status Endpoint", "Missing required fields")
                 return False
@@ -119,17 +278,17 @@ class ValidationTest:
                 self.log_pass("Session Status Optimization", "validation_history removed from response")
             
             # Check if second request is faster (cached)
-            if time2 < time1:
-                self.log_pass("Session Status Caching", f"Cached request faster: {time1:.2f}ms → {time2:.2f}ms")
+            if time2_ns < time1_ns:
+                self.log_pass("Session Status Caching", "Cached request faster: %.2fms → %.2fms", _ms(time1_ns), _ms(time2_ns))
             else:
-                self.log_warning("Session Status Caching", f"Cached request not faster: {time1:.2f}ms → {time2:.2f}ms")
+                self.log_warning("Session Status Caching", "Cached request not faster: %.2fms → %.2fms", _ms(time1_ns), _ms(time2_ns))
             
             # Check response time
-            if time2 < 200:
-                self.log_pass("Session Status Response Time", f"{time2:.2f}ms < 200ms")
+            if time2_ns < THRESHOLD_NS:
+                self.log_pass("Session Status Response Time", "%.2fms < 200ms", _ms(time2_ns))
                 return True
             else:
-                self.log_fail("Session Status Response Time", f"{time2:.2f}ms >= 200ms")
+                self.log_fail("Session Status Response Time", "%.2fms >= 200ms", _ms(time2_ns))
                 return False
                 
         except Exception as e:
@@ -141,35 +300,35 @@ class ValidationTest:
         try:
             # Create a complete FIR
             resp = await self.client.post(
-                f"{MAIN_BACKEND_URL}/process",
+                "/process",
                 data={"text": "Test complaint for FIR validation"}
             )
             resp.raise_for_status()
-            result = resp.json()
-            session_id = result.get("session_id")
+            session_id = decode_as(resp.content, ProcessResult).session_id
             
             # Complete workflow to get FIR
             for _ in range(5):
                 resp = await self.client.post(
-                    f"{MAIN_BACKEND_URL}/validate",
+                    "/validate",
                     json={"session_id": session_id, "approved": True}
                 )
                 resp.raise_for_status()
-                result = resp.json()
+                result = decode_as(resp.content, ValidateResult)
                 
-                if result.get("completed"):
-                    fir_number = result.get("content", {}).get("fir_number")
+                if result.completed:
+                    fir_number = (result.content or {}).get("fir_number")
                     break
             else:
                 self.log_fail("FIR Creation", "Could not create FIR")
                 return False
             
-            # Test /fir/{number} endpoint (status only)
-            start = time.perf_counter()
-            resp1 = await self.client.get(f"{MAIN_BACKEND_URL}/fir/{fir_number}")
-            time1 = (time.perf_counter() - start) * 1000
-            resp1.raise_for_status()
-            status_data = resp1.json()
+            # Status endpoint (uncached, then cached), then the content endpoint, so the
+            # content request doesn't load the backend while the status timings run
+            resp1, time1_ns, time3_ns = await self.measure_cached(f"/fir/{fir_number}")
+            resp2, time2_ns = await timed(
+                self.client.get(f"/fir/{fir_number}/content", headers={"Accept-Encoding": CONTENT_ENCODING})
+            )
+            status_data = json_loads(resp1.content)
             
             # Verify content is NOT in response (optimization)
             if "content" in status_data:
@@ -178,40 +337,32 @@ class ValidationTest:
                 self.log_pass("FIR Status Optimization", "content removed from status endpoint")
             
             # Test /fir/{number}/content endpoint
-            start = time.perf_counter()
-            resp2 = await self.client.get(f"{MAIN_BACKEND_URL}/fir/{fir_number}/content")
-            time2 = (time.perf_counter() - start) * 1000
             resp2.raise_for_status()
-            content_data = resp2.json()
+            content_data = decode_as(resp2.content, FIRContent)
             
             # Verify content IS in response
-            if "content" not in content_data:
+            if content_data.content is None:
                 self.log_fail("FIR Content Endpoint", "content missing from content endpoint")
                 return False
             else:
                 self.log_pass("FIR Content Endpoint", "content present in content endpoint")
             
-            # Test caching - request status again
-            start = time.perf_counter()
-            resp3 = await self.client.get(f"{MAIN_BACKEND_URL}/fir/{fir_number}")
-            time3 = (time.perf_counter() - start) * 1000
-            resp3.raise_for_status()
-            
-            if time3 < time1:
-                self.log_pass("FIR Status Caching", f"Cached request faster: {time1:.2f}ms → {time3:.2f}ms")
+            # Test caching - status requested again
+            if time3_ns < time1_ns:
+                self.log_pass("FIR Status Caching", "Cached request faster: %.2fms → %.2fms", _ms(time1_ns), _ms(time3_ns))
             else:
-                self.log_warning("FIR Status Caching", f"Cached request not faster: {time1:.2f}ms → {time3:.2f}ms")
+                self.log_warning("FIR Status Caching", "Cached request not faster: %.2fms → %.2fms", _ms(time1_ns), _ms(time3_ns))
             
             # Check response times
-            if time3 < 200:
-                self.log_pass("FIR Status Response Time", f"{time3:.2f}ms < 200ms")
+            if time3_ns < THRESHOLD_NS:
+                self.log_pass("FIR Status Response Time", "%.2fms < 200ms", _ms(time3_ns))
             else:
-                self.log_fail("FIR Status Response Time", f"{time3:.2f}ms >= 200ms")
+                self.log_fail("FIR Status Response Time", "%.2fms >= 200ms", _ms(time3_ns))
             
-            if time2 < 200:
-                self.log_pass("FIR Content Response Time", f"{time2:.2f}ms < 200ms")
+            if time2_ns < THRESHOLD_NS:
+                self.log_pass("FIR Content Response Time", "%.2fms < 200ms", _ms(time2_ns))
             else:
-                self.log_warning("FIR Content Response Time", f"{time2:.2f}ms >= 200ms (acceptable for content endpoint)")
+                self.log_warning("FIR Content Response Time", "%.2fms >= 200ms (acceptable for content endpoint)", _ms(time2_ns))
             
             return True
             
@@ -222,30 +373,21 @@ class ValidationTest:
     async def test_metrics_endpoint(self) -> bool:
         """Test metrics endpoint with caching"""
         try:
-            # First request (uncached)
-            start = time.perf_counter()
-            resp1 = await self.client.get(f"{MAIN_BACKEND_URL}/metrics")
-            time1 = (time.perf_counter() - start) * 1000
-            resp1.raise_for_status()
-            
-            # Second request (should be cached)
-            start = time.perf_counter()
-            resp2 = await self.client.get(f"{MAIN_BACKEND_URL}/metrics")
-            time2 = (time.perf_counter() - start) * 1000
-            resp2.raise_for_status()
+            # First request (uncached), then repeats (should be cached)
+            _, time1_ns, time2_ns = await self.measure_cached("/metrics")
             
             # Check if second request is faster (cached)
-            if time2 < time1:
-                self.log_pass("Metrics Caching", f"Cached request faster: {time1:.2f}ms → {time2:.2f}ms")
+            if time2_ns < time1_ns:
+                self.log_pass("Metrics Caching", "Cached request faster: %.2fms → %.2fms", _ms(time1_ns), _ms(time2_ns))
             else:
-                self.log_warning("Metrics Caching", f"Cached request not faster: {time1:.2f}ms → {time2:.2f}ms")
+                self.log_warning("Metrics Caching", "Cached request not faster: %.2fms → %.2fms", _ms(time1_ns), _ms(time2_ns))
             
             # Check response time
-            if time2 < 200:
-                self.log_pass("Metrics Response Time", f"{time2:.2f}ms < 200ms")
+            if time2_ns < THRESHOLD_NS:
+                self.log_pass("Metrics Response Time", "%.2fms < 200ms", _ms(time2_ns))
                 return True
             else:
-                self.log_fail("Metrics Response Time", f"{time2:.2f}ms >= 200ms")
+                self.log_fail("Metrics Response Time", "%.2fms >= 200ms", _ms(time2_ns))
                 return False
                 
         except Exception as e:
@@ -255,23 +397,39 @@ class ValidationTest:
     async def test_list_firs_endpoint(self) -> bool:
         """Test list_firs endpoint"""
         try:
-            start = time.perf_counter()
-            resp = await self.client.get(f"{MAIN_BACKEND_URL}/list_firs")
-            elapsed = (time.perf_counter() - start) * 1000
+            start_ns = time.perf_counter_ns()
+            resp = await self.client.get("/list_firs")
+            elapsed_ns = time.perf_counter_ns() - start_ns
             resp.raise_for_status()
             
             # Check response time
-            if elapsed < 200:
-                self.log_pass("List FIRs Response Time", f"{elapsed:.2f}ms < 200ms")
+            if elapsed_ns < THRESHOLD_NS:
+                self.log_pass("List FIRs Response Time", "%.2fms < 200ms", _ms(elapsed_ns))
                 return True
             else:
-                self.log_fail("List FIRs Response Time", f"{elapsed:.2f}ms >= 200ms")
+                self.log_fail("List FIRs Response Time", "%.2fms >= 200ms", _ms(elapsed_ns))
                 return False
                 
         except Exception as e:
             self.log_fail("List FIRs Endpoint", str(e))
             return False
     
+    async def run_buffered(self, title: str, test, skip_reason: Optional[str] = None):
+        """Run one test with its output captured; return (passed, captured text)"""
+        buf = io.StringIO()
+        _output.set(buf)  # gather runs each test in its own task, so this stays local to it
+        emit(title)
+        emit("-" * 70)
+        passed = False
+        if skip_reason:
+            self.log_warning(title, "skipped (%s)", skip_reason)
+        else:
+            try:
+                passed = await test()
+            except Exception as e:
+                self.log_fail(title, str(e))
+        return passed, buf.getvalue()
+    
     async def run_all_tests(self):
         """Run all validation tests"""
         print("="*70)
@@ -279,35 +437,38 @@ class ValidationTest:
         print("="*70)
         print()
         
-        # Test 1: Health endpoint
-        print("Test 1: Health Endpoint")
-        print("-" * 70)
-        await self.test_health_endpoint()
-        print()
-        
-        # Test 2: Session status endpoint
-        print("Test 2: Session Status Endpoint")
-        print("-" * 70)
-        await self.test_session_status_endpoint()
-        print()
-        
-        # Test 3: FIR endpoints
-        print("Test 3: FIR Endpoints")
-        print("-" * 70)
-        await self.test_fir_endpoints()
-        print()
+        health = "Test 1: Health Endpoint"
+        tests = [
+            # (name, test, prerequisite that must pass first)
+            (health, self.test_health_endpoint, None),
+            ("Test 2: Session Status Endpoint", self.test_session_status_endpoint, health),
+            ("Test 3: FIR Endpoints", self.test_fir_endpoints, health),
+            ("Test 4: Metrics Endpoint", self.test_metrics_endpoint, health),
+            ("Test 5: List FIRs Endpoint", self.test_list_firs_endpoint, health),
+        ]
         
-        # Test 4: Metrics endpoint
-        print("Test 4: Metrics Endpoint")
-        print("-" * 70)
-        await self.test_metrics_endpoint()
-        print()
+        outputs = {}
+        passed_names = set()
+        remaining = tests
+        while remaining:
+            # Each wave runs every test whose prerequisite has finished, concurrently
+            ready = [t for t in remaining if t[2] is None or t[2] in outputs]
+            remaining = [t for t in remaining if t[2] is not None and t[2] not in outputs]
+            wave = await asyncio.gather(*(
+                self.run_buffered(
+                    name, test,
+                    skip_reason=None if dep is None or dep in passed_names else f"{dep} failed"
+                )
+                for name, test, dep in ready
+            ))
+            for (name, _, _), (passed, output) in zip(ready, wave):
+                outputs[name] = output
+                if passed:
+                    passed_names.add(name)
         
-        # Test 5: List FIRs endpoint
-        print("Test 5: List FIRs Endpoint")
-        print("-" * 70)
-        await self.test_list_firs_endpoint()
-        print()
+        # Print each test's output in declared order
+        for name, _, _ in tests:
+            print(outputs[name])
         
         # Print summary
         self.print_summary()
@@ -319,9 +480,10 @@ class ValidationTest:
         print("="*70)
         print()
         
-        passed = len(self.results["passed"])
-        failed = len(self.results["failed"])
-        warnings = len(self.results["warnings"])
+        counts = self.results["counts"]
+        passed = counts["passed"]
+        failed = counts["failed"]
+        warnings = counts["warnings"]
         total = passed + failed
         
         print(f"Tests Passed: {passed}/{total}")
@@ -331,14 +493,12 @@ class ValidationTest:
         
         if failed > 0:
             print("Failed Tests:")
-            for fail in self.results["failed"]:
-                print(f"  ❌ {fail['test']}: {fail['message']}")
+            print("\n".join(self.summary_lines["failed"]))
             print()
         
         if warnings > 0:
             print("Warnings:")
-            for warn in self.results["warnings"]:
-                print(f"  ⚠️  {warn['test']}: {warn['message']}")
+            print("\n".join(self.summary_lines["warnings"]))
             print()
         
         print("="*70)
@@ -353,8 +513,11 @@ class ValidationTest:
         print("="*70)
         
         # Save results
-        with open("validation_results.json", "w") as f:
-            json.dump(self.results, f, indent=2)
+        fd = os.open("validation_results.json", os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, json_dumps_pretty(self.results))
+        finally:
+            os.close(fd)
         print("\n📊 Results saved to validation_results.json")
 
 async def main():
@@ -370,4 +533,6 @@ async def main():
             traceback.print_exc()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # asyncio.Runner takes a loop factory on 3.11, where asyncio.run() does not yet
+    with asyncio.Runner(loop_factory=uvloop.new_event_loop if UVLOOP_AVAILABLE else None) as runner:
+        runner.run(main())
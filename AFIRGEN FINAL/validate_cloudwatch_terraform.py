@@ -4,9 +4,53 @@ Tests that the Terraform files are properly configured
 """
 
 import os
+import re
 import json
+import mmap
+import shutil
 import subprocess
 import sys
+from functools import lru_cache
+
+
+TERRAFORM_DIR = "AFIRGEN FINAL/terraform"
+
+# Dashboard variable references, matched in one scan instead of one search per name
+_VAR_REF_RE = re.compile(rb"var\.(environment|aws_region)")
+
+
+@lru_cache(maxsize=None)
+def read_source(path):
+    """Map a source file read-only once and share the mapping between tests
+    
+    Checks run on the mapped bytes directly, without decoding the file to str. Use
+    find() for substring tests: `in` on an mmap only matches single bytes.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+@lru_cache(maxsize=None)
+def _needle_alternation(needles):
+    """Compile needles into one pattern that matches, at any position, the longest of them
+    
+    The alternation sits in a lookahead, so matches are zero-width and overlapping needles
+    are all seen rather than consumed by an earlier match.
+    """
+    ordered = sorted(needles, key=len, reverse=True)
+    return re.compile(b"(?=(" + b"|".join(map(re.escape, ordered)) + b"))")
+
+
+def find_substrings(content, needles):
+    """Return the set of bytes needles that occur in content, found in a single pass"""
+    needles = tuple(needles)
+    matched = {m.group(1) for m in _needle_alternation(needles).finditer(content)}
+    # Only the longest needle is reported at each position; shorter needles starting there
+    # are prefixes of it, so they occur too
+    return {needle for needle in needles if any(m.startswith(needle) for m in matched)}
+
 
 def test_terraform_files_exist():
     """Test that all required Terraform files exist"""
@@ -37,8 +81,7 @@ def test_dashboard_configuration():
     print("TEST: Dashboard Configuration")
     print("="*60)
     
-    with open("AFIRGEN FINAL/terraform/cloudwatch_dashboards.tf", "r") as f:
-        content = f.read()
+    content = read_source("AFIRGEN FINAL/terraform/cloudwatch_dashboards.tf")
     
     # Check for required dashboards
     required_dashboards = [
@@ -47,8 +90,9 @@ def test_dashboard_configuration():
         "afirgen_performance"
     ]
     
+    found = find_substrings(content, (b'resource "aws_cloudwatch_dashboard" "%s"' % d.encode() for d in required_dashboards))
     for dashboard in required_dashboards:
-        if f'resource "aws_cloudwatch_dashboard" "{dashboard}"' in content:
+        if b'resource "aws_cloudwatch_dashboard" "%s"' % dashboard.encode() in found:
             print(f"✅ Dashboard defined: {dashboard}")
         else:
             print(f"❌ Missing dashboard: {dashboard}")
@@ -69,15 +113,16 @@ def test_dashboard_configuration():
         "HealthChecks"
     ]
     
+    found = find_substrings(content, (m.encode() for m in required_metrics))
     for metric in required_metrics:
-        if metric in content:
+        if metric.encode() in found:
             print(f"✅ Metric referenced: {metric}")
         else:
             print(f"❌ Missing metric: {metric}")
             return False
     
     # Check for variable references
-    if "var.environment" in content and "var.aws_region" in content:
+    if len(set(_VAR_REF_RE.findall(content))) == 2:
         print("✅ Variables properly referenced")
     else:
         print("❌ Variables not properly referenced")
@@ -93,11 +138,10 @@ def test_alarm_configuration():
     print("TEST: Alarm Configuration")
     print("="*60)
     
-    with open("AFIRGEN FINAL/terraform/cloudwatch_alarms.tf", "r") as f:
-        content = f.read()
+    content = read_source("AFIRGEN FINAL/terraform/cloudwatch_alarms.tf")
     
     # Check for SNS topic
-    if 'resource "aws_sns_topic" "cloudwatch_alarms"' in content:
+    if content.find(b'resource "aws_sns_topic" "cloudwatch_alarms"') != -1:
         print("✅ SNS topic defined")
     else:
         print("❌ Missing SNS topic")
@@ -116,22 +160,23 @@ def test_alarm_configuration():
         "low_cache_hit_rate"
     ]
     
+    found = find_substrings(content, (b'resource "aws_cloudwatch_metric_alarm" "%s"' % a.encode() for a in required_alarms))
     for alarm in required_alarms:
-        if f'resource "aws_cloudwatch_metric_alarm" "{alarm}"' in content:
+        if b'resource "aws_cloudwatch_metric_alarm" "%s"' % alarm.encode() in found:
             print(f"✅ Alarm defined: {alarm}")
         else:
             print(f"❌ Missing alarm: {alarm}")
             return False
     
     # Check for composite alarm
-    if 'resource "aws_cloudwatch_composite_alarm" "critical_system_health"' in content:
+    if content.find(b'resource "aws_cloudwatch_composite_alarm" "critical_system_health"') != -1:
         print("✅ Composite alarm defined")
     else:
         print("❌ Missing composite alarm")
         return False
     
     # Check for alarm actions
-    if "alarm_actions" in content and "aws_sns_topic.cloudwatch_alarms.arn" in content:
+    if content.find(b"alarm_actions") != -1 and content.find(b"aws_sns_topic.cloudwatch_alarms.arn") != -1:
         print("✅ Alarm actions configured")
     else:
         print("❌ Alarm actions not configured")
@@ -147,8 +192,7 @@ def test_variables_configuration():
     print("TEST: Variables Configuration")
     print("="*60)
     
-    with open("AFIRGEN FINAL/terraform/variables.tf", "r") as f:
-        content = f.read()
+    content = read_source("AFIRGEN FINAL/terraform/variables.tf")
     
     # Check for required variables
     required_variables = [
@@ -157,8 +201,9 @@ def test_variables_configuration():
         "alarm_email"
     ]
     
+    found = find_substrings(content, (b'variable "%s"' % v.encode() for v in required_variables))
     for var in required_variables:
-        if f'variable "{var}"' in content:
+        if b'variable "%s"' % var.encode() in found:
             print(f"✅ Variable defined: {var}")
         else:
             print(f"❌ Missing variable: {var}")
@@ -175,28 +220,19 @@ def test_terraform_syntax():
     print("="*60)
     
     # Check if terraform is installed
-    try:
-        result = subprocess.run(
-            ["terraform", "version"],
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
-        if result.returncode != 0:
-            print("⚠️  Terraform not installed - skipping syntax validation")
-            return True
-    except (subprocess.TimeoutExpired, FileNotFoundError):
+    terraform = shutil.which("terraform")
+    if terraform is None:
         print("⚠️  Terraform not installed - skipping syntax validation")
         return True
     
-    # Run terraform fmt check
+    # -chdir keeps the working directory of this process untouched
+    chdir = f"-chdir={TERRAFORM_DIR}"
+    
     try:
-        os.chdir("AFIRGEN FINAL/terraform")
-        
         # Initialize terraform (required for validation)
         print("Initializing Terraform...")
         result = subprocess.run(
-            ["terraform", "init", "-backend=false"],
+            [terraform, chdir, "init", "-backend=false"],
             capture_output=True,
             text=True,
             timeout=60
@@ -204,34 +240,41 @@ def test_terraform_syntax():
         
         if result.returncode != 0:
             print(f"⚠️  Terraform init failed: {result.stderr}")
-            os.chdir("../..")
             return True  # Don't fail on init issues
         
         # Validate configuration
         print("Validating Terraform configuration...")
         result = subprocess.run(
-            ["terraform", "validate"],
+            [terraform, chdir, "validate", "-json"],
             capture_output=True,
             text=True,
             timeout=30
         )
         
-        os.chdir("../..")
-        
         if result.returncode == 0:
             print("✅ Terraform configuration is valid")
             return True
-        else:
+        
+        # The exit status decides; -json output only supplies the error details
+        try:
+            report = json.loads(result.stdout)
+        except json.JSONDecodeError:
             print(f"❌ Terraform validation failed:\n{result.stderr}")
             return False
+        
+        errors = "\n".join(
+            f"  {d.get('summary')}: {d.get('detail', '')}"
+            for d in report.get("diagnostics", [])
+            if d.get("severity") == "error"
+        )
+        print(f"❌ Terraform validation failed:\n{errors or result.stderr}")
+        return False
             
     except subprocess.TimeoutExpired:
         print("⚠️  Terraform validation timed out - skipping")
-        os.chdir("../..")
         return True
     except Exception as e:
         print(f"⚠️  Terraform validation error: {e}")
-        os.chdir("../..")
         return True
 
 
@@ -241,18 +284,17 @@ def test_dashboard_json_structure():
     print("TEST: Dashboard JSON Structure")
     print("="*60)
     
-    with open("AFIRGEN FINAL/terraform/cloudwatch_dashboards.tf", "r") as f:
-        content = f.read()
+    content = read_source("AFIRGEN FINAL/terraform/cloudwatch_dashboards.tf")
     
     # Check for jsonencode usage
-    if "jsonencode(" in content:
+    if content.find(b"jsonencode(") != -1:
         print("✅ Using jsonencode for dashboard body")
     else:
         print("❌ Not using jsonencode")
         return False
     
     # Check for widgets array
-    if "widgets = [" in content:
+    if content.find(b"widgets = [") != -1:
         print("✅ Widgets array defined")
     else:
         print("❌ Widgets array not defined")
@@ -261,8 +303,9 @@ def test_dashboard_json_structure():
     # Check for metric properties
     required_properties = ["type", "properties", "metrics", "period", "stat", "region", "title"]
     
+    found = find_substrings(content, (p.encode() for p in required_properties))
     for prop in required_properties:
-        if prop in content:
+        if prop.encode() in found:
             print(f"✅ Property used: {prop}")
         else:
             print(f"❌ Missing property: {prop}")
@@ -279,12 +322,10 @@ def test_integration_with_metrics_module():
     print("="*60)
     
     # Read metrics module
-    with open("AFIRGEN FINAL/main backend/cloudwatch_metrics.py", "r") as f:
-        metrics_content = f.read()
+    metrics_content = read_source("AFIRGEN FINAL/main backend/cloudwatch_metrics.py")
     
     # Read dashboard config
-    with open("AFIRGEN FINAL/terraform/cloudwatch_dashboards.tf", "r") as f:
-        dashboard_content = f.read()
+    dashboard_content = read_source("AFIRGEN FINAL/terraform/cloudwatch_dashboards.tf")
     
     # Extract metric names from convenience functions
     metric_names = [
@@ -304,10 +345,13 @@ def test_integration_with_metrics_module():
         "HealthChecks"
     ]
     
-    for metric in metric_names:
-        if metric in metrics_content and metric in dashboard_content:
+    needles = [m.encode() for m in metric_names]
+    in_metrics = find_substrings(metrics_content, needles)
+    in_dashboard = find_substrings(dashboard_content, needles)
+    for metric, needle in zip(metric_names, needles):
+        if needle in in_metrics and needle in in_dashboard:
             print(f"✅ Metric integrated: {metric}")
-        elif metric in metrics_content:
+        elif needle in in_metrics:
             print(f"⚠️  Metric defined but not in dashboard: {metric}")
         else:
             print(f"❌ Metric not defined: {metric}")
@@ -3,23 +3,85 @@ Verify CloudWatch Implementation (Windows-compatible)
 Simple verification without Unicode characters
 """
 
+import mmap
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+# Files and the terms each must contain
+CONTENT_CHECKS = [
+    (
+        "AFIRGEN FINAL/main backend/cloudwatch_metrics.py",
+        ["CloudWatchMetrics", "put_metric", "record_count", "record_duration"],
+        "Metrics module has required functions"
+    ),
+    (
+        "AFIRGEN FINAL/terraform/cloudwatch_dashboards.tf",
+        ["aws_cloudwatch_dashboard", "afirgen_main", "afirgen_errors", "afirgen_performance"],
+        "Dashboards defined"
+    ),
+    (
+        "AFIRGEN FINAL/terraform/cloudwatch_alarms.tf",
+        ["aws_cloudwatch_metric_alarm", "high_error_rate", "aws_sns_topic"],
+        "Alarms and SNS defined"
+    ),
+    (
+        "AFIRGEN FINAL/main backend/agentv5.py",
+        ["from cloudwatch_metrics import", "record_api_request", "record_auth_event"],
+        "Application integration"
+    ),
+]
+
+# The checks with their terms encoded to bytes once at import, since files are scanned as
+# undecoded bytes, and the union of the terms each file is scanned for
+_CONTENT_NEEDLES = tuple(
+    (path, tuple(term.encode("utf-8") for term in terms), name)
+    for path, terms, name in CONTENT_CHECKS
+)
+_NEEDLES_BY_PATH = {}
+for _path, _needles, _ in _CONTENT_NEEDLES:
+    _NEEDLES_BY_PATH.setdefault(_path, set()).update(_needles)
+
+_SEP = "=" * 70
+_SUB_SEP = "-" * 70
+
+@lru_cache(maxsize=None)
+def _dir_entries(parent):
+    """Names in a directory, listed once per directory instead of one stat per file"""
+    try:
+        with os.scandir(parent) as it:
+            return frozenset(entry.name for entry in it)
+    except OSError:
+        return frozenset()
 
 def check_file(path, name):
     """Check if file exists"""
-    exists = os.path.exists(path)
+    exists = os.path.basename(path) in _dir_entries(os.path.dirname(path) or '.')
     status = "OK" if exists else "MISSING"
     print(f"[{status}] {name}")
     return exists
 
-def check_content(path, search_terms, name):
-    """Check if file contains required content"""
+@lru_cache(maxsize=None)
+def _found_terms(path):
+    """Scan a file once for every term any content check needs from it
+    
+    Returns the set of those terms present, so several checks against the same file share
+    one read.
+    """
+    terms = _NEEDLES_BY_PATH[path]
+    # Scan the mapped bytes in place instead of decoding the whole file to str
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return frozenset()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+            return frozenset(term for term in terms if content.find(term) != -1)
+
+def check_content(path, needles, name):
+    """Check if file contains required content, given as bytes needles"""
     try:
-        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-        
-        found = all(term in content for term in search_terms)
+        found_terms = _found_terms(path)
+        found = all(needle in found_terms for needle in needles)
         status = "OK" if found else "MISSING"
         print(f"[{status}] {name}")
         return found
@@ -28,16 +90,23 @@ def check_content(path, search_terms, name):
         return False
 
 def main():
-    print("\n" + "="*70)
+    print("\n" + _SEP)
     print("CLOUDWATCH IMPLEMENTATION VERIFICATION")
-    print("="*70)
+    print(_SEP)
     
     passed = 0
     total = 0
     
+    # Scan the content-check files on a thread pool while the existence checks run. Results
+    # land in _found_terms' cache; a failed scan is not cached, so check_content retries
+    # it and reports the error
+    pool = ThreadPoolExecutor(max_workers=len(_NEEDLES_BY_PATH))
+    for path in _NEEDLES_BY_PATH:
+        pool.submit(_found_terms, path)
+    
     # Core files
     print("\nCore Files:")
-    print("-" * 70)
+    print(_SUB_SEP)
     
     checks = [
         ("AFIRGEN FINAL/main backend/cloudwatch_metrics.py", "CloudWatch Metrics Module"),
@@ -53,7 +122,7 @@ def main():
     
     # Documentation
     print("\nDocumentation:")
-    print("-" * 70)
+    print(_SUB_SEP)
     
     docs = [
         ("AFIRGEN FINAL/CLOUDWATCH-DASHBOARDS-IMPLEMENTATION.md", "Implementation Guide"),
@@ -70,7 +139,7 @@ def main():
     
     # Test files
     print("\nTest Files:")
-    print("-" * 70)
+    print(_SUB_SEP)
     
     tests = [
         ("AFIRGEN FINAL/test_cloudwatch_metrics.py", "Metrics Tests"),
@@ -84,40 +153,19 @@ def main():
     
     # Content checks
     print("\nContent Verification:")
-    print("-" * 70)
-    
-    content_checks = [
-        (
-            "AFIRGEN FINAL/main backend/cloudwatch_metrics.py",
-            ["CloudWatchMetrics", "put_metric", "record_count", "record_duration"],
-            "Metrics module has required functions"
-        ),
-        (
-            "AFIRGEN FINAL/terraform/cloudwatch_dashboards.tf",
-            ["aws_cloudwatch_dashboard", "afirgen_main", "afirgen_errors", "afirgen_performance"],
-            "Dashboards defined"
-        ),
-        (
-            "AFIRGEN FINAL/terraform/cloudwatch_alarms.tf",
-            ["aws_cloudwatch_metric_alarm", "high_error_rate", "aws_sns_topic"],
-            "Alarms and SNS defined"
-        ),
-        (
-            "AFIRGEN FINAL/main backend/agentv5.py",
-            ["from cloudwatch_metrics import", "record_api_request", "record_auth_event"],
-            "Application integration"
-        ),
-    ]
+    print(_SUB_SEP)
+    
+    pool.shutdown(wait=True)
     
-    for path, terms, name in content_checks:
+    for path, needles, name in _CONTENT_NEEDLES:
         total += 1
-        if check_content(path, terms, name):
+        if check_content(path, needles, name):
             passed += 1
     
     # Summary
-    print("\n" + "="*70)
+    print("\n" + _SEP)
     print("SUMMARY")
-    print("="*70)
+    print(_SEP)
     print(f"Passed: {passed}/{total}")
     print(f"Success Rate: {(passed/total)*100:.1f}%")
     